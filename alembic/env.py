@@ -5,12 +5,19 @@ import os, sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.db import Base, DB_URL
 from app import models
+from app.tenancy import tenant_schema, tenant_url, validate_tenant
 
 config = context.config
 
 if config.config_file_name is not None and config.get_section("loggers"):
     fileConfig(config.config_file_name)
 
+# Tenant shard: alembic -x tenant=<id> upgrade head (see app/tenancy.py)
+TENANT = context.get_x_argument(as_dictionary=True).get("tenant")
+if TENANT:
+    DB_URL = tenant_url(validate_tenant(TENANT), DB_URL, create=True)
+SCHEMA = tenant_schema(TENANT, DB_URL) if TENANT else None
+
 # También escribe la URL en el config para que otros comandos la vean
 if DB_URL:
     config.set_main_option("sqlalchemy.url", DB_URL)
@@ -29,7 +36,12 @@ def run_migrations_online():
     opts = {"url": DB_URL or config.get_main_option("sqlalchemy.url")}
     connectable = engine_from_config(opts, prefix="", poolclass=pool.NullPool)
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        if SCHEMA:
+            # Each Postgres tenant schema has its own tables and alembic_version
+            connection.exec_driver_sql(f'CREATE SCHEMA IF NOT EXISTS "{SCHEMA}"')
+            connection.exec_driver_sql(f'SET search_path TO "{SCHEMA}"')
+            connection.commit()
+        context.configure(connection=connection, target_metadata=target_metadata, version_table_schema=SCHEMA)
         with context.begin_transaction():
             context.run_migrations()
 
@@ -0,0 +1,41 @@
+"""change version columns and per-table change counter
+
+Revision ID: 0002_change_version
+Revises: cef6817de124
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from app.utils.backfill import create_index_online, drop_index_online
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_change_version'
+down_revision = 'cef6817de124'
+branch_labels = None
+depends_on = None
+
+TABLES = ("departments", "jobs", "employees")
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column("change_version", sa.BigInteger, nullable=False, server_default="0"))
+    # Built after the columns are committed; CONCURRENTLY on Postgres, so writes continue meanwhile
+    for table in TABLES:
+        create_index_online(f"ix_{table}_change_version", table, ["change_version"])
+
+    counter = op.create_table(
+        "change_counter",
+        sa.Column("table_name", sa.String(64), primary_key=True),
+        sa.Column("version", sa.BigInteger, nullable=False, server_default="0"),
+    )
+    op.bulk_insert(counter, [{"table_name": t, "version": 0} for t in TABLES])
+
+
+def downgrade() -> None:
+    op.drop_table("change_counter")
+    for table in TABLES:
+        drop_index_online(f"ix_{table}_change_version", table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column("change_version")
@@ -0,0 +1,167 @@
+"""
+Application configuration loaded from config/*.yaml.
+Values in settings.yaml override the defaults below, section by section.
+
+The merged result is cached in a JSON snapshot outside the source tree:
+$CONFIG_SNAPSHOT, default <$XDG_CACHE_HOME or ~/.cache>/db_migration_api/
+(precompiled at image build time with `python -m app.config`). While that
+snapshot is newer than the YAML files it is loaded with the stdlib json
+module, so workers start without importing or parsing YAML. Otherwise the
+YAML is parsed and the snapshot rewritten with an atomic rename (concurrent
+workers never see a partial file); if it cannot be written, the config is
+just kept in memory.
+"""
+import json
+import os
+
+CONFIG_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "config"))
+MAP_FILE = os.path.join(CONFIG_DIR, "header_mappings.yaml")
+SET_FILE = os.path.join(CONFIG_DIR, "settings.yaml")
+
+def _default_snapshot_file() -> str:
+    # Per user (never a shared temp dir another user could plant a snapshot in), one per checkout
+    import hashlib
+
+    cache = os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    checkout = hashlib.sha1(CONFIG_DIR.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache, "db_migration_api", f"config-{checkout}.json")
+
+SNAPSHOT_FILE = os.getenv("CONFIG_SNAPSHOT") or _default_snapshot_file()
+
+def _load_yaml(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    import yaml  # only needed when the snapshot is missing or stale
+
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+# Safe defaults if YAML files are missing
+DEFAULT_SETTINGS = {
+    "database": {
+        "pool_size": 10,  # connections kept per worker (non-SQLite engines)
+        "max_overflow": 5,
+        "read_replicas": [],  # read-only URLs for metrics/change feed (env READ_REPLICA_URLS overrides)
+        "replica_check_interval_s": 5,  # health check period of each replica
+    },
+    "ingest": {
+        "use_copy_for_postgres": True,
+        "fail_fast_on_header_mismatch": False,
+        "upsert": "",  # "", "ignore", "update"
+        "batch_size": 5000,  # rows per executemany round trip
+        "duplicates": "reject",  # keys repeated in a file: "first_wins" | "last_wins" | "reject"
+        "memory_budget_mb": 64,  # coerced rows kept in memory per ingest before spilling to disk
+        "spill_dir": "",  # directory of the spill files (default: system temp dir)
+    },
+    "analytics": {
+        "snapshot": True,  # in-memory columnar snapshot for /metrics/hiring (needs numpy)
+    },
+    "profiling": {
+        "sql": False,  # time every statement (see /admin/queries)
+        "slow_query_ms": 500,  # log statements slower than this (as their fingerprint)
+        "log_parameters": False,  # include bound values in the slow query log (may contain personal data)
+        "requests": True,  # allow per-request profiling with X-Profile (admin only)
+        "sample_interval_ms": 1.0,
+        "profile_dir": "",  # default: <tmp>/db_migration_api_profiles
+        "max_profiles": 50,
+        "max_profile_mb": 200,
+    },
+    "backfill": {
+        "batch_size": 5000,  # initial rows per batch of run_backfill (app/utils/backfill.py)
+        "pause_ms": 50,  # sleep between batches
+        "target_batch_ms": 500,  # batch size adapts to stay near this duration
+    },
+    "tenancy": {
+        "enabled": False,  # route requests with X-Tenant-Id (or /t/{tenant}/...) to per-tenant databases
+        "header": "X-Tenant-Id",
+        "required": False,  # reject requests without a tenant instead of using the primary
+        "url_template": "",  # e.g. sqlite:///./tenants/{tenant}.db; empty = primary URL (Postgres schemas)
+        "schema_template": "tenant_{tenant}",  # Postgres search_path per tenant
+        "tenants": [],  # known tenants for `python -m app.tenancy migrate` (existing shards are discovered)
+        "discovery_interval_s": 30,  # other tenant ids get 404; existing shards are re-listed at most this often
+        "max_engines": 32,  # LRU cap of open tenant engines per worker
+        "idle_timeout_s": 600,  # tenant engines unused this long are disposed
+        "pool_size": 2,  # per-tenant pool caps
+        "max_overflow": 2,
+    },
+    "group_commit": {
+        "enabled": True,  # coalesce concurrent JSON /batch writes per table (app/utils/group_commit.py)
+        "max_wait_ms": 2,  # how long a leader waits for other batches to join
+        "max_rows": 5000,  # flush as soon as this many rows are queued
+        "lock_timeout_ms": 2000,  # Postgres: give up (503) when a bulk load holds the table's change counter
+    },
+    "admission": {
+        "enabled": True,
+        "max_concurrent_ingests": 4,  # per worker, capped by pool size minus read_reserved_connections
+        "per_table_limit": 2,  # int, or {table: limit, default: limit}
+        "per_tenant_limit": 2,  # concurrent ingests of one tenant (tables are limited per tenant too)
+        "max_inflight_mb": 256,  # byte budget of uploads being ingested at once
+        "max_queue": 16,  # waiting ingests before answering 429
+        "queue_timeout_s": 30,
+        "read_reserved_connections": 4,  # pool connections kept free for read endpoints
+    },
+}
+
+def _merge(defaults: dict, overrides: dict) -> dict:
+    merged = {k: dict(v) if isinstance(v, dict) else v for k, v in defaults.items()}
+    for k, v in (overrides or {}).items():
+        if isinstance(v, dict) and isinstance(merged.get(k), dict):
+            merged[k].update(v)
+        else:
+            merged[k] = v
+    return merged
+
+def _load_snapshot(path: str = SNAPSHOT_FILE):
+    # Valid only if newer than every YAML source and built from the same defaults
+    try:
+        built = os.stat(path).st_mtime
+        if any(os.path.exists(p) and os.stat(p).st_mtime > built for p in (MAP_FILE, SET_FILE)):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if data.get("defaults") == DEFAULT_SETTINGS else None
+
+def _write_snapshot(data: dict, path: str):
+    import tempfile  # only when the snapshot is (re)built
+
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Unique temp file in the target directory, then rename: atomic, and workers never share a temp name
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".config-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+def _parse_config() -> dict:
+    return {
+        "defaults": DEFAULT_SETTINGS,
+        "header_maps": _load_yaml(MAP_FILE),
+        "settings": _merge(DEFAULT_SETTINGS, _load_yaml(SET_FILE)),
+    }
+
+def compile_config(path: str = SNAPSHOT_FILE) -> dict:
+    """Parses the YAML files and writes the JSON snapshot (best effort: read-only filesystems just skip it)."""
+    data = _parse_config()
+    try:
+        _write_snapshot(data, path)
+    except OSError:
+        pass
+    return data
+
+_CONFIG = _load_snapshot() or compile_config()
+HEADER_MAPS = _CONFIG["header_maps"]
+SETTINGS = _CONFIG["settings"]
+
+def setting(section: str, key: str, default=None):
+    return SETTINGS.get(section, {}).get(key, default)
+
+if __name__ == "__main__":
+    # Build step: unlike at import, failing to write the snapshot is an error
+    _write_snapshot(_parse_config(), SNAPSHOT_FILE)
+    print(f"Wrote {SNAPSHOT_FILE}")
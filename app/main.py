@@ -1,5 +1,8 @@
 from fastapi import FastAPI
-from .routers import ingest, departments, jobs, employees, metrics
+from .config import setting
+from .routers import ingest, departments, jobs, employees, metrics, changes, admin
+from .utils.query_profiler import query_profiler
+from .utils.request_profiler import ProfilingMiddleware
 
 # Initialize FastAPI application
 app = FastAPI(title="DB Migration API", version="1.1.0")
@@ -10,6 +13,21 @@ app.include_router(departments.router)
 app.include_router(jobs.router)
 app.include_router(employees.router)
 app.include_router(metrics.router)
+app.include_router(changes.router)
+app.include_router(admin.router)
+
+# Tenant-scoped copies of the data routes: /t/{tenant}/... (404 while tenancy is disabled;
+# the X-Tenant-Id header works on the plain routes)
+for tenant_router in (ingest.router, departments.router, jobs.router, employees.router, metrics.router, changes.router):
+    app.include_router(tenant_router, prefix="/t/{tenant}", include_in_schema=False)
+
+# SQL statement timing on every engine (exposed on /admin/queries); off unless profiling.sql is set
+if setting("profiling", "sql", False):
+    query_profiler.install()
+
+# Opt-in per-request profiling (X-Profile: 1 + X-Admin-Token); flag-less requests pass straight through
+if setting("profiling", "requests", True):
+    app.add_middleware(ProfilingMiddleware, interval_ms=float(setting("profiling", "sample_interval_ms", 1.0)))
 
 # Health check endpoint
 @app.get("/health")
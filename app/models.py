@@ -1,4 +1,4 @@
-from sqlalchemy import String, Integer, Date, ForeignKey
+from sqlalchemy import String, Integer, BigInteger, Date, ForeignKey, DDL, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from .db import Base
 
@@ -8,6 +8,8 @@ class Department(Base):
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     name: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
+    # Set by every write (see app/utils/changes.py); drives GET /changes/{table}
+    change_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0", index=True)
 
 # Job model
 class Job(Base):
@@ -15,6 +17,7 @@ class Job(Base):
     
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(120), unique=True, nullable=False)
+    change_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0", index=True)
 
 # Employee model
 class Employee(Base):
@@ -25,7 +28,21 @@ class Employee(Base):
     department_id: Mapped[int] = mapped_column(ForeignKey("departments.id"), nullable=True)
     job_id: Mapped[int] = mapped_column(ForeignKey("jobs.id"), nullable=True)
     hire_date: Mapped[Date] = mapped_column(Date, nullable=True)
+    change_version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0, server_default="0", index=True)
 
     # Relationships (joins)
     department = relationship("Department")
     job = relationship("Job")
+
+# Last committed change version per table (one row per table)
+class ChangeCounter(Base):
+    __tablename__ = "change_counter"
+
+    table_name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+event.listen(
+    ChangeCounter.__table__,
+    "after_create",
+    DDL("INSERT INTO change_counter (table_name, version) VALUES ('departments', 0), ('jobs', 0), ('employees', 0)"),
+)
@@ -0,0 +1,60 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.responses import FileResponse
+from ..db import get_tenant_engines
+from ..security import require_admin
+from ..utils.admission import admission
+from ..utils.group_commit import group_commit
+from ..utils.query_profiler import query_profiler
+from ..utils.request_profiler import profile_store
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+# SQL statement stats aggregated by fingerprint
+@router.get("/queries")
+def list_queries(
+    order_by: str = Query("total_ms", pattern="^(total_ms|p95_ms|max_ms|count|rows)$"),
+    limit: int = Query(50, ge=1, le=1000),
+):
+    return {"enabled": query_profiler.installed, "queries": query_profiler.report(order_by=order_by, limit=limit)}
+
+@router.delete("/queries")
+def reset_queries():
+    query_profiler.reset()
+    return {"status": "ok"}
+
+# EXPLAIN (ANALYZE on Postgres, QUERY PLAN on SQLite) for the last sample of a fingerprint
+@router.get("/queries/{fingerprint}/explain")
+def explain_query(fingerprint: str, analyze: bool = Query(False, description="Postgres only: EXPLAIN ANALYZE (executed and rolled back)")):
+    try:
+        return query_profiler.explain(fingerprint, analyze=analyze)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown fingerprint: {fingerprint}")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+# Per-request profiles captured with X-Profile: 1 (speedscope JSON)
+@router.get("/profiles")
+def list_profiles():
+    return profile_store.list()
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: str):
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or evicted profile: {profile_id}")
+    return FileResponse(path, media_type="application/json", filename=f"{profile_id}.speedscope.json")
+
+# Ingestion admission control state (this worker)
+@router.get("/admission")
+def admission_status():
+    return admission.status()
+
+# Open tenant engines and their pools (this worker)
+@router.get("/tenants")
+def tenants_status():
+    return get_tenant_engines().status()
+
+# JSON /batch group commit counters (this worker)
+@router.get("/group-commit")
+def group_commit_status():
+    return group_commit.status()
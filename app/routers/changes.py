@@ -0,0 +1,37 @@
+import json
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from starlette.responses import StreamingResponse
+from ..db import get_read_db
+from ..utils.changes import current_watermark
+from ..utils.types import TableName, EXPECTED_HEADERS
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+def _stream_changes(engine, table: TableName, since: int, watermark: int):
+    # Runs after the request session is closed, so it opens its own connection
+    cols = ", ".join(EXPECTED_HEADERS[table] + ["change_version"])
+    sql = text(f"""
+        SELECT {cols} FROM {table}
+        WHERE change_version > :since AND change_version <= :watermark
+        ORDER BY change_version, id
+    """)
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True).execute(sql, {"since": since, "watermark": watermark})
+        for chunk in result.mappings().partitions(1000):
+            yield "".join(json.dumps(dict(row), default=str) + "\n" for row in chunk)
+
+# Incremental export: rows inserted or updated after a previously returned watermark
+@router.get("/{table}")
+def table_changes(
+    table: TableName,
+    since: int = Query(0, ge=0, description="Watermark returned by the previous call (0 = full export)"),
+    db: Session = Depends(get_read_db),
+):
+    watermark = current_watermark(db, table)
+    return StreamingResponse(
+        _stream_changes(db.get_bind(), table, since, watermark),
+        media_type="application/x-ndjson",
+        headers={"X-Watermark": str(watermark)},
+    )
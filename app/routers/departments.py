@@ -1,33 +1,37 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..db import get_db
+from ..tenancy import tenant_from_request
 from ..schemas import DepartmentBatch
 from ..models import Department
-import csv
-from io import StringIO
+from ..utils.admission import admission
+from ..utils.csv_ingest import ingest_csv, open_upload
+from ..utils.changes import ChangeCounterBusy
+from ..utils.group_commit import group_commit
 
 router = APIRouter(prefix="/departments", tags=["departments"])
 
-# Ingestion from CSV file
+# Ingestion from CSV file (same streaming pipeline as /ingest/csv)
 @router.post("/upload")
-async def upload_departments(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_departments(
+    request: Request,
+    file: UploadFile = File(...),
+    skip_invalid_rows: bool = Form(False, description="Skip invalid rows instead of failing the entire load"),
+    db: Session = Depends(get_db)
+):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
 
-    content = await file.read()
-    decoded = content.decode("utf-8")
-    reader = csv.DictReader(StringIO(decoded))
-
-    payload = [row for row in reader]
-
     try:
-        with db.begin():
-            db.bulk_insert_mappings(Department, payload)
+        async with admission.admit("departments", file.size or 0, tenant=tenant_from_request(request)):
+            result = await run_in_threadpool(ingest_csv, db, "departments", open_upload(file), skip_invalid_rows=skip_invalid_rows)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Insert failed: {e}")
 
-    return {"inserted": len(payload)}
-
+    return result
 
 # Ingestion from JSON
 @router.post("/batch")
@@ -37,12 +41,14 @@ def batch_insert_departments(items: DepartmentBatch, db: Session = Depends(get_d
 
     payload = [i.model_dump() for i in items]
 
+    # Coalesced with concurrent batches of the same table into one INSERT + commit
     try:
-        with db.begin():
-            db.bulk_insert_mappings(Department, payload)
+        inserted = group_commit.submit(db, "departments", Department, payload)
+    except ChangeCounterBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Insert failed: {e}")
 
-    return {"inserted": len(payload)}
+    return {"inserted": inserted}
 
 
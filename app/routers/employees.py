@@ -1,41 +1,37 @@
-from datetime import datetime
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..db import get_db
+from ..tenancy import tenant_from_request
 from ..schemas import EmployeeBatch
 from ..models import Employee
-import csv
-from io import StringIO
+from ..utils.admission import admission
+from ..utils.csv_ingest import ingest_csv, open_upload
+from ..utils.changes import ChangeCounterBusy
+from ..utils.group_commit import group_commit
 
 router = APIRouter(prefix="/employees", tags=["employees"])
 
-# Ingestion from CSV file
+# Ingestion from CSV file (same streaming pipeline as /ingest/csv)
 @router.post("/upload")
-async def upload_employees(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    content = await file.read()
-    decoded = content.decode("utf-8")
-    reader = csv.DictReader(StringIO(decoded))
-    payload = []
-
-    for row in reader:
-        # Convert dates
-        if "hire_date" in row and row["hire_date"]:
-            row["hire_date"] = datetime.fromisoformat(row["hire_date"].replace("Z", "")).date()
-        
-        # Convert empty strings to None
-        for key in ["job_id", "department_id"]:
-            if row.get(key) == "":
-                row[key] = None
-
-        payload.append(row)
+async def upload_employees(
+    request: Request,
+    file: UploadFile = File(...),
+    skip_invalid_rows: bool = Form(False, description="Skip invalid rows instead of failing the entire load"),
+    db: Session = Depends(get_db)
+):
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="File must be a CSV")
 
     try:
-        with db.begin():
-            db.bulk_insert_mappings(Employee, payload)
+        async with admission.admit("employees", file.size or 0, tenant=tenant_from_request(request)):
+            result = await run_in_threadpool(ingest_csv, db, "employees", open_upload(file), skip_invalid_rows=skip_invalid_rows)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Insert failed: {e}")
 
-    return {"inserted": len(payload)}
+    return result
 
 # Ingestion from JSON
 @router.post("/batch")
@@ -45,10 +41,12 @@ def batch_insert_employees(items: EmployeeBatch, db: Session = Depends(get_db)):
 
     payload = [i.model_dump() for i in items]
 
+    # Coalesced with concurrent batches of the same table into one INSERT + commit
     try:
-        with db.begin():
-            db.bulk_insert_mappings(Employee, payload)
+        inserted = group_commit.submit(db, "employees", Employee, payload)
+    except ChangeCounterBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Insert failed: {e}")
 
-    return {"inserted": len(payload)}
+    return {"inserted": inserted}
@@ -1,27 +1,118 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
+import os
+import tempfile
+from typing import Literal
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import StreamingResponse
 from ..db import get_db
-from ..utils.csv_ingest import ingest_csv, _open_source
+from ..security import require_admin
+from ..tenancy import tenant_from_request
+from ..utils.admission import admission
+from ..utils.csv_ingest import ingest_csv, validate_csv, open_upload, _open_source
+from ..utils.db_ingest import ingest_database
 from ..utils.types import TableName
 
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
+# Error reports up to this size stay in memory; larger ones spill to disk
+REPORT_SPOOL_BYTES = 1024 * 1024
+
+def _source_size(file: UploadFile | None, source_path: str | None) -> int:
+    if file:
+        return file.size or 0
+    if source_path.startswith(("http://", "https://")):
+        return 0  # unknown until streamed
+    if os.path.isfile(source_path):
+        return os.path.getsize(source_path)
+    return len(source_path)  # inline CSV content
+
+def _with_source(file: UploadFile | None, source_path: str | None, fn, db: Session, table: TableName, *args, **kwargs):
+    # Runs in the threadpool: opening a URL (HTTP request) or a file blocks
+    source = open_upload(file) if file else _open_source(source_path)
+    try:
+        return fn(db, table, source, *args, **kwargs)
+    finally:
+        if not file:
+            source.close()
+
+def _stream_report(report, chunk_size: int = 64 * 1024):
+    try:
+        report.seek(0)
+        while chunk := report.read(chunk_size):
+            yield chunk
+    finally:
+        report.close()
+
 @router.post("/csv")
 async def ingest_csv_upload(
+    request: Request,
     table: TableName = Form(...),
     file: UploadFile = File(None),
     source_path: str | None = Form(None),
     skip_invalid_rows: bool = Form(False, description="Skip invalid rows instead of failing the entire load"),
+    duplicates: Literal["first_wins", "last_wins", "reject"] | None = Form(None, description="Keys repeated inside the file; default from settings (ingest.duplicates)"),
+    mode: Literal["insert", "upsert", "replace"] = Form("insert", description="replace: the file becomes the table's full content (atomic swap)"),
+    dry_run: bool = Form(False, description="Validate only: nothing is written, a CSV error report (row, column, error) is returned"),
     db: Session = Depends(get_db)
 ):
     if not file and not source_path:
         raise HTTPException(status_code=400, detail="Provide either 'file' or 'source_path'.")
 
-    content = (await file.read()).decode("utf-8") if file else _open_source(source_path).read()
-
+    report = tempfile.SpooledTemporaryFile(max_size=REPORT_SPOOL_BYTES, mode="w+", encoding="utf-8", newline="") if dry_run else None
     try:
-        result = ingest_csv(db, table, content, skip_invalid_rows=skip_invalid_rows)
+        # Bounded concurrency / byte budget; 429 + Retry-After when the wait queue is full
+        async with admission.admit(table, _source_size(file, source_path), tenant=tenant_from_request(request)):
+            # Stream the upload/source; opening, parsing and writing run off the event loop
+            if dry_run:
+                result = await run_in_threadpool(_with_source, file, source_path, validate_csv, db, table, report, mode=mode)
+            else:
+                result = await run_in_threadpool(_with_source, file, source_path, ingest_csv, db, table,
+                                                 skip_invalid_rows=skip_invalid_rows, duplicates=duplicates, mode=mode)
+    except HTTPException:
+        if report:
+            report.close()
+        raise
     except Exception as e:
+        if report:
+            report.close()
         raise HTTPException(status_code=400, detail=str(e))
 
+    if dry_run:
+        return StreamingResponse(
+            _stream_report(report),
+            media_type="text/csv; charset=utf-8",
+            headers={
+                "Content-Disposition": f'attachment; filename="{table}_dry_run_errors.csv"',
+                "X-Rows-Checked": str(result["rows"]),
+                "X-Rows-Valid": str(result["valid"]),
+                "X-Rows-Failed": str(result["failed"]),
+                "X-File-Errors": str(result["file_errors"]),
+            },
+        )
     return {"status": "ok", "table": table, **(result or {})}
+
+# Direct migration from another database (no CSV round trip). Admin only: the server
+# connects to whatever URL or local file path it is given.
+@router.post("/database", dependencies=[Depends(require_admin)])
+async def ingest_from_database(
+    request: Request,
+    source: str = Form(..., description="SQLite file path or SQLAlchemy URL of the source database"),
+    tables: str | None = Form(None, description="Comma separated subset of departments,jobs,employees (default: all)"),
+    mode: Literal["insert", "upsert", "replace"] = Form("insert"),
+    skip_invalid_rows: bool = Form(False, description="Skip invalid rows instead of failing the table"),
+    duplicates: Literal["first_wins", "last_wins", "reject"] | None = Form(None, description="Keys repeated inside a source table; default from settings (ingest.duplicates)"),
+    db: Session = Depends(get_db)
+):
+    selected = [t.strip() for t in tables.split(",") if t.strip()] if tables else None
+    size = os.path.getsize(source) if os.path.isfile(source) else 0
+    try:
+        async with admission.admit("database", size, tenant=tenant_from_request(request)):
+            result = await run_in_threadpool(ingest_database, db, source, selected, mode=mode,
+                                          skip_invalid_rows=skip_invalid_rows, duplicates=duplicates)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"status": "ok", "tables": result}
@@ -1,31 +1,37 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Request
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from ..db import get_db
+from ..tenancy import tenant_from_request
 from ..schemas import JobBatch
 from ..models import Job
-import csv
-from io import StringIO
+from ..utils.admission import admission
+from ..utils.csv_ingest import ingest_csv, open_upload
+from ..utils.changes import ChangeCounterBusy
+from ..utils.group_commit import group_commit
 
 router = APIRouter(prefix="/jobs", tags=["jobs"])
 
-# Ingestion from CSV file
+# Ingestion from CSV file (same streaming pipeline as /ingest/csv)
 @router.post("/upload")
-async def upload_jobs(file: UploadFile = File(...), db: Session = Depends(get_db)):
+async def upload_jobs(
+    request: Request,
+    file: UploadFile = File(...),
+    skip_invalid_rows: bool = Form(False, description="Skip invalid rows instead of failing the entire load"),
+    db: Session = Depends(get_db)
+):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
 
-    content = await file.read()
-    decoded = content.decode("utf-8")
-    reader = csv.DictReader(StringIO(decoded))
-    payload = [row for row in reader]
-
     try:
-        with db.begin():
-            db.bulk_insert_mappings(Job, payload)
+        async with admission.admit("jobs", file.size or 0, tenant=tenant_from_request(request)):
+            result = await run_in_threadpool(ingest_csv, db, "jobs", open_upload(file), skip_invalid_rows=skip_invalid_rows)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Insert failed: {e}")
 
-    return {"inserted": len(payload)}
+    return result
 
 # Ingestion from JSON
 @router.post("/batch")
@@ -35,10 +41,12 @@ def batch_insert_jobs(items: JobBatch, db: Session = Depends(get_db)):
 
     payload = [i.model_dump() for i in items]
 
+    # Coalesced with concurrent batches of the same table into one INSERT + commit
     try:
-        with db.begin():
-            db.bulk_insert_mappings(Job, payload)
+        inserted = group_commit.submit(db, "jobs", Job, payload)
+    except ChangeCounterBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Insert failed: {e}")
 
-    return {"inserted": len(payload)}
+    return {"inserted": inserted}
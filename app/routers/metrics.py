@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from starlette.responses import Response
-from ..db import get_db
+from ..db import get_read_db
+from ..utils.hiring_snapshot import GROUP_KEYS, get_snapshot
 import csv, io
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
@@ -25,7 +26,7 @@ def hiring_by_quarter(
     year: int = Query(2021, ge=1900, le=2100),
     format: str = Query("json", pattern="^(json|csv)$"),
     include_unknown: bool = Query(True, description="Include rows without department/job as '(Unknown)'"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     dialect = db.bind.dialect.name
     params = {"y": year, "y_next": year + 1}
@@ -101,7 +102,7 @@ def departments_above_mean(
     year: int = Query(2021, ge=1900, le=2100),
     format: str = Query("json", pattern="^(json|csv)$"),
     include_unknown: bool = Query(True, description="Include '(Unknown)' as department when missing"),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     dialect = db.bind.dialect.name
     if dialect.startswith("postgresql"):
@@ -133,3 +134,69 @@ def departments_above_mean(
     if format == "csv":
         return _csv_response(rows, ["id", "department", "hired"], f"departments_above_mean_{year}.csv")
     return rows
+
+def _hiring_sql(db: Session, group_by: list[str], year: int | None, include_unknown: bool) -> list[dict]:
+    """Generic SQL group-by over employees; fallback and reference for the snapshot."""
+    if db.bind.dialect.name.startswith("postgresql"):
+        year_expr = "EXTRACT(YEAR FROM e.hire_date)::int"
+        month_expr = "EXTRACT(MONTH FROM e.hire_date)::int"
+    else:
+        year_expr = "CAST(substr(e.hire_date, 1, 4) AS INTEGER)"
+        month_expr = "CAST(substr(e.hire_date, 6, 2) AS INTEGER)"
+    exprs = {
+        "year": year_expr,
+        "quarter": f"(({month_expr} + 2) / 3)",
+        "month": month_expr,
+        "department": "COALESCE(d.name, '(Unknown)')",
+        "job": "COALESCE(j.title, '(Unknown)')",
+    }
+    where = "e.hire_date IS NOT NULL"
+    if year is not None:
+        where += f" AND {year_expr} = :y"
+    if not include_unknown:
+        where += " AND e.department_id IS NOT NULL AND e.job_id IS NOT NULL"
+
+    select_list = ", ".join(f'{exprs[k]} AS "{k}"' for k in group_by)
+    group_list = ", ".join(exprs[k] for k in group_by)
+    sql = text(f"""
+        SELECT {select_list}, COUNT(*) AS hired
+        FROM employees e
+        LEFT JOIN departments d ON d.id = e.department_id
+        LEFT JOIN jobs j        ON j.id = e.job_id
+        WHERE {where}
+        GROUP BY {group_list}
+        ORDER BY {", ".join(str(i + 1) for i in range(len(group_by)))};
+    """)
+    return [dict(r) for r in db.execute(sql, {"y": year}).mappings().all()]
+
+@router.get("/hiring")
+def hiring(
+    response: Response,
+    group_by: str = Query("department,quarter", description=f"Comma-separated keys: {', '.join(GROUP_KEYS)}"),
+    year: int | None = Query(None, ge=1900, le=2100),
+    format: str = Query("json", pattern="^(json|csv)$"),
+    include_unknown: bool = Query(True, description="Include rows without department/job as '(Unknown)'"),
+    source: str = Query("auto", pattern="^(auto|snapshot|sql)$", description="auto = snapshot when available, else SQL"),
+    db: Session = Depends(get_read_db),
+):
+    keys = [k.strip() for k in group_by.split(",") if k.strip()]
+    invalid = [k for k in keys if k not in GROUP_KEYS]
+    if not keys or invalid or len(set(keys)) != len(keys):
+        raise HTTPException(status_code=400, detail=f"group_by must be distinct keys from {list(GROUP_KEYS)}")
+
+    # db may be a lagging read replica: the snapshot (one per replica) follows that replica's own
+    # change_counter, so rows it receives late are still merged once they arrive
+    snapshot = get_snapshot(db) if source != "sql" else None
+    if source == "snapshot" and snapshot is None:
+        raise HTTPException(status_code=400, detail="Snapshot is disabled or numpy is not installed.")
+
+    if snapshot is not None:
+        rows = snapshot.aggregate(keys, year=year, include_unknown=include_unknown)
+        response.headers["X-Metrics-Source"] = "snapshot"
+    else:
+        rows = _hiring_sql(db, keys, year, include_unknown)
+        response.headers["X-Metrics-Source"] = "sql"
+
+    if format == "csv":
+        return _csv_response(rows, keys + ["hired"], f"hiring_by_{'_'.join(keys)}.csv")
+    return rows
@@ -0,0 +1,24 @@
+"""
+Guard for operational/admin endpoints.
+Admin access requires the X-Admin-Token header to match the ADMIN_TOKEN
+environment variable; when ADMIN_TOKEN is not set, admin endpoints are disabled.
+"""
+import hmac
+import os
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+ADMIN_HEADER = "X-Admin-Token"
+
+def is_admin_token(token: Optional[str]) -> bool:
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), expected.encode("utf-8"))
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not os.getenv("ADMIN_TOKEN"):
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set).")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=401, detail=f"Missing or invalid {ADMIN_HEADER} header.")
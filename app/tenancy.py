@@ -0,0 +1,249 @@
+"""
+Tenant-sharded databases.
+
+When `tenancy.enabled` is on, a request that carries the tenant header
+(X-Tenant-Id by default) or is served under /t/{tenant}/... runs against that
+tenant's own database:
+- SQLite: one file per tenant, `tenancy.url_template` must contain {tenant}
+  (e.g. sqlite:///./tenants/{tenant}.db);
+- Postgres: the url_template (default: the primary URL) with the session
+  search_path set to `tenancy.schema_template` (e.g. tenant_{tenant}).
+Tenant engines live in an LRU cache: at most `max_engines` are open, idle
+ones are disposed after `idle_timeout_s`, and each has its own small pool
+(`pool_size` + `max_overflow`), so one tenant's load cannot take every
+connection. Requests without a tenant use the primary database.
+
+Shards are migrated with `alembic -x tenant=<id> upgrade head`, or all of them
+at once with `python -m app.tenancy migrate`.
+"""
+import glob
+import os
+import re
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine
+
+from .config import setting
+
+_TENANT_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+def tenancy_enabled() -> bool:
+    return bool(setting("tenancy", "enabled", False))
+
+def validate_tenant(tenant: str) -> str:
+    tenant = tenant.strip().lower()
+    if not _TENANT_ID.match(tenant):
+        raise HTTPException(status_code=400, detail="Invalid tenant id (use a-z, 0-9, '-' and '_', max 63 chars).")
+    return tenant
+
+def tenant_from_request(request) -> Optional[str]:
+    """Tenant of a request (path parameter first, then header), or None."""
+    path_tenant = request.path_params.get("tenant")
+    if not tenancy_enabled():
+        if path_tenant:
+            raise HTTPException(status_code=404, detail="Tenancy is disabled.")
+        return None
+    tenant = path_tenant or request.headers.get(setting("tenancy", "header", "X-Tenant-Id"))
+    if not tenant:
+        if setting("tenancy", "required", False):
+            raise HTTPException(status_code=400, detail="Missing tenant.")
+        return None
+    return validate_tenant(tenant)
+
+# ----------------------------
+# Tenant -> URL / schema
+# ----------------------------
+def _url_template(primary_url: str) -> str:
+    return os.getenv("TENANT_DB_URL_TEMPLATE") or setting("tenancy", "url_template", "") or primary_url
+
+def tenant_url(tenant: str, primary_url: str, create: bool = False) -> str:
+    """Database URL of a tenant shard; create=True (migrations) also creates the SQLite directory."""
+    template = _url_template(primary_url)
+    if template.startswith("sqlite") and "{tenant}" not in template:
+        raise ValueError("tenancy.url_template must contain {tenant} for SQLite (one file per tenant).")
+    url = template.format(tenant=tenant)
+    if create and url.startswith("sqlite:///"):
+        directory = os.path.dirname(url[len("sqlite:///"):])
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    return url
+
+def tenant_schema(tenant: str, url: str) -> Optional[str]:
+    """
+    Postgres schema of a tenant (None for other dialects). The tenant id is used verbatim
+    (the schema is always quoted), so distinct tenants never map to the same schema.
+    """
+    template = setting("tenancy", "schema_template", "tenant_{tenant}")
+    if not url.startswith("postgresql") or not template:
+        return None
+    schema = template.format(tenant=tenant)
+    if len(schema.encode("utf-8")) > 63:
+        # Postgres would silently truncate it, and two long ids could then share a schema
+        raise ValueError(f"Schema name for tenant {tenant!r} exceeds 63 bytes.")
+    return schema
+
+# search_path schema of each Postgres tenant engine
+_engine_schemas: "weakref.WeakKeyDictionary[Engine, str]" = weakref.WeakKeyDictionary()
+
+def bind_key(engine: Engine) -> Tuple[int, Optional[str]]:
+    """
+    Identity of the database behind an engine, for per-database registries (group
+    commit, snapshots). Postgres tenants share one URL and differ only by search_path,
+    so the key is the engine object itself plus its schema, never the URL.
+    Registries keyed on it drop the entry when the engine is collected (see weakref.finalize).
+    """
+    return id(engine), _engine_schemas.get(engine)
+
+def _set_search_path(engine: Engine, schema: str):
+    _engine_schemas[engine] = schema
+
+    @event.listens_for(engine, "connect")
+    def _search_path(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        cur.execute(f'SET search_path TO "{schema}"')
+        cur.close()
+        dbapi_conn.commit()
+
+# ----------------------------
+# LRU engine cache
+# ----------------------------
+class TenantEngineCache:
+    def __init__(self, primary_url: str, max_engines: int = 32, idle_timeout: float = 600.0,
+                 pool_size: int = 2, max_overflow: int = 2, on_evict: Optional[Callable[[Engine], None]] = None,
+                 discovery_interval: float = 30.0):
+        self.primary_url = primary_url
+        self.max_engines = max_engines
+        self.idle_timeout = idle_timeout
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.on_evict = on_evict
+        self.discovery_interval = discovery_interval
+        self._engines: "OrderedDict[str, list]" = OrderedDict()  # tenant -> [engine, last_used]
+        self._known: frozenset = frozenset()
+        self._known_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def is_known(self, tenant: str) -> bool:
+        """
+        Configured tenants and existing shards only (known_tenants), so a client cannot
+        create shards by sending new ids. The list is re-read on a miss, at most once
+        per `discovery_interval` seconds, to pick up shards migrated since.
+        """
+        if tenant in self._known:
+            return True
+        now = time.monotonic()
+        if now - self._known_at >= self.discovery_interval:
+            self._known_at = now
+            self._known = frozenset(known_tenants(self.primary_url))
+        return tenant in self._known
+
+    def _create(self, tenant: str) -> Engine:
+        url = tenant_url(tenant, self.primary_url)
+        opts = {"pool_size": self.pool_size, "max_overflow": self.max_overflow, "pool_pre_ping": True}
+        if url.startswith("sqlite"):
+            opts["connect_args"] = {"check_same_thread": False}
+        engine = create_engine(url, **opts)
+        schema = tenant_schema(tenant, url)
+        if schema:
+            _set_search_path(engine, schema)
+        return engine
+
+    def get(self, tenant: str) -> Engine:
+        with self._lock:
+            opened = tenant in self._engines
+        if not opened and not self.is_known(tenant):
+            raise HTTPException(status_code=404, detail=f"Unknown tenant: {tenant}")
+        now = time.monotonic()
+        evicted = []
+        with self._lock:
+            entry = self._engines.get(tenant)
+            if entry is None:
+                entry = self._engines[tenant] = [self._create(tenant), now]
+            entry[1] = now
+            self._engines.move_to_end(tenant)
+            # Least recently used first: drop idle engines, then enforce the size cap
+            for name, (engine, last_used) in list(self._engines.items()):
+                if name != tenant and (now - last_used > self.idle_timeout or len(self._engines) > self.max_engines):
+                    evicted.append(self._engines.pop(name)[0])
+        for engine in evicted:
+            self._dispose(engine)
+        return entry[0]
+
+    def _dispose(self, engine: Engine):
+        # Checked-out connections stay valid and are closed when returned
+        engine.dispose()
+        if self.on_evict is not None:
+            self.on_evict(engine)
+
+    def tenants(self) -> List[str]:
+        with self._lock:
+            return list(self._engines)
+
+    def clear(self, close: bool = True):
+        with self._lock:
+            engines = [e for e, _ in self._engines.values()]
+            self._engines.clear()
+        for engine in engines:
+            engine.dispose(close=close)
+
+    def status(self) -> Dict[str, object]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "engines": len(self._engines),
+                "max_engines": self.max_engines,
+                "tenants": {t: {"idle_s": round(now - last, 1), "pool": e.pool.status()} for t, (e, last) in self._engines.items()},
+            }
+
+# ----------------------------
+# Shard migrations
+# ----------------------------
+def known_tenants(primary_url: str) -> List[str]:
+    """Configured tenants plus the shards that already exist (SQLite files / Postgres schemas)."""
+    tenants = set(setting("tenancy", "tenants", []) or [])
+    template = _url_template(primary_url)
+    if template.startswith("sqlite:///") and "{tenant}" in template:
+        pattern = template[len("sqlite:///"):]
+        prefix, suffix = pattern.split("{tenant}", 1)
+        for path in glob.glob(pattern.replace("{tenant}", "*")):
+            tenants.add(path[len(prefix):len(path) - len(suffix)])
+    elif template.startswith("postgresql") and "{tenant}" not in template:
+        schema_template = setting("tenancy", "schema_template", "tenant_{tenant}")
+        prefix = schema_template.split("{tenant}", 1)[0]
+        engine = create_engine(template)
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(text("SELECT schema_name FROM information_schema.schemata WHERE schema_name LIKE :p"),
+                                    {"p": prefix.replace("_", r"\_") + "%"})
+                tenants.update(name[len(prefix):] for (name,) in rows)
+        finally:
+            engine.dispose()
+    return sorted(t for t in tenants if _TENANT_ID.match(t))
+
+def migrate_tenants(tenants: Optional[List[str]] = None, revision: str = "head", ini_path: str = "alembic.ini") -> List[str]:
+    """Runs `alembic upgrade <revision>` on each tenant shard (default: all known tenants)."""
+    from argparse import Namespace
+    from alembic import command
+    from alembic.config import Config
+    from .db import DB_URL
+
+    done = []
+    for tenant in tenants or known_tenants(DB_URL):
+        cfg = Config(ini_path, cmd_opts=Namespace(x=[f"tenant={validate_tenant(tenant)}"]))
+        command.upgrade(cfg, revision)
+        done.append(tenant)
+    return done
+
+if __name__ == "__main__":
+    # python -m app.tenancy migrate [tenant ...]
+    if len(sys.argv) < 2 or sys.argv[1] != "migrate":
+        sys.exit("usage: python -m app.tenancy migrate [tenant ...]")
+    for name in migrate_tenants(sys.argv[2:] or None):
+        print(f"migrated {name}")
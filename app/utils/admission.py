@@ -0,0 +1,153 @@
+"""
+Admission control for CSV ingestion.
+
+Every ingest runs inside `admission.admit(table, nbytes)`, which enforces:
+- a global limit on concurrent ingests, capped so that `read_reserved_connections`
+  of the DB pool always stay free for the read endpoints (metrics, lookups);
+- a per-table limit on concurrent ingests, counted per tenant (tenant shards
+  are separate databases, one tenant's loads must not queue another's);
+- a per-tenant limit, so one tenant cannot take every global slot;
+- a byte budget for the uploads being processed at the same time;
+- a bounded wait queue: when it is full, or a request waited `queue_timeout_s`,
+  the request is rejected with 429 and a Retry-After estimate.
+Limits are per worker process.
+"""
+import asyncio
+import math
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, Union
+
+from fastapi import HTTPException
+
+from ..config import setting
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        per_table: Union[int, Dict[str, int]] = 2,
+        per_tenant: int = 2,
+        max_bytes: int = 256 * 1024 * 1024,
+        max_queue: int = 16,
+        queue_timeout: float = 30.0,
+        enabled: bool = True,
+    ):
+        self.max_concurrent = max_concurrent
+        self.per_table = per_table
+        self.per_tenant = per_tenant
+        self.max_bytes = max_bytes
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.enabled = enabled
+
+        self.active = 0
+        self.active_by_table: Counter = Counter()  # (tenant, table) -> active ingests
+        self.active_by_tenant: Counter = Counter()
+        self.bytes_in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._avg_seconds = 1.0  # EWMA of ingest duration, for Retry-After
+        self._cond: Optional[asyncio.Condition] = None
+        self._loop = None
+
+    def _condition(self) -> asyncio.Condition:
+        # asyncio primitives are bound to the loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._cond is None or self._loop is not loop:
+            self._cond, self._loop = asyncio.Condition(), loop
+        return self._cond
+
+    def table_limit(self, table: str) -> int:
+        if isinstance(self.per_table, dict):
+            return int(self.per_table.get(table, self.per_table.get("default", self.max_concurrent)))
+        return int(self.per_table)
+
+    def _fits(self, table: str, tenant: Optional[str], nbytes: int) -> bool:
+        return (
+            self.active < self.max_concurrent
+            and self.active_by_table[(tenant, table)] < self.table_limit(table)
+            and (tenant is None or self.active_by_tenant[tenant] < self.per_tenant)
+            # A single upload larger than the whole budget is admitted when nothing else runs
+            and (self.bytes_in_flight == 0 or self.bytes_in_flight + nbytes <= self.max_bytes)
+        )
+
+    def retry_after(self) -> int:
+        slots = max(1, self.max_concurrent)
+        return max(1, math.ceil(self._avg_seconds * (self.waiting + 1) / slots))
+
+    def _reject(self, reason: str):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=429,
+            detail=f"Ingestion is at capacity ({reason}). Retry later.",
+            headers={"Retry-After": str(self.retry_after())},
+        )
+
+    @asynccontextmanager
+    async def admit(self, table: str, nbytes: int = 0, tenant: Optional[str] = None):
+        if not self.enabled:
+            yield
+            return
+
+        cond = self._condition()
+        async with cond:
+            if not self._fits(table, tenant, nbytes):
+                if self.waiting >= self.max_queue:
+                    self._reject("wait queue is full")
+                self.waiting += 1
+                try:
+                    await asyncio.wait_for(cond.wait_for(lambda: self._fits(table, tenant, nbytes)), self.queue_timeout)
+                except asyncio.TimeoutError:
+                    self._reject("timed out waiting for a slot")
+                finally:
+                    self.waiting -= 1
+            self.active += 1
+            self.active_by_table[(tenant, table)] += 1
+            if tenant is not None:
+                self.active_by_tenant[tenant] += 1
+            self.bytes_in_flight += nbytes
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - started)
+            async with cond:
+                self.active -= 1
+                self.active_by_table[(tenant, table)] -= 1
+                if tenant is not None:
+                    self.active_by_tenant[tenant] -= 1
+                self.bytes_in_flight -= nbytes
+                cond.notify_all()
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "active": self.active,
+            "active_by_table": {(f"{tenant}/{t}" if tenant else t): n for (tenant, t), n in self.active_by_table.items() if n},
+            "active_by_tenant": {t: n for t, n in self.active_by_tenant.items() if n},
+            "bytes_in_flight": self.bytes_in_flight,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "max_concurrent": self.max_concurrent,
+            "max_bytes": self.max_bytes,
+            "max_queue": self.max_queue,
+        }
+
+def _from_settings() -> AdmissionController:
+    # Ingests may use at most pool capacity minus the connections reserved for reads
+    pool_capacity = int(setting("database", "pool_size", 10)) + int(setting("database", "max_overflow", 5))
+    reserved = int(setting("admission", "read_reserved_connections", 4))
+    max_concurrent = min(int(setting("admission", "max_concurrent_ingests", 4)), max(1, pool_capacity - reserved))
+    return AdmissionController(
+        max_concurrent=max_concurrent,
+        per_table=setting("admission", "per_table_limit", 2),
+        per_tenant=int(setting("admission", "per_tenant_limit", 2)),
+        max_bytes=int(setting("admission", "max_inflight_mb", 256)) * 1024 * 1024,
+        max_queue=int(setting("admission", "max_queue", 16)),
+        queue_timeout=float(setting("admission", "queue_timeout_s", 30)),
+        enabled=bool(setting("admission", "enabled", True)),
+    )
+
+admission = _from_settings()
@@ -0,0 +1,220 @@
+"""
+Online data migrations for large tables.
+
+run_backfill() walks a table in primary-key order and applies an UPDATE (or a
+callable) to one key range at a time, committing every batch together with
+its progress row in `backfill_progress`. A run that is interrupted resumes
+after the last committed key; a finished backfill is a no-op. Batches are
+throttled with a pause and resized to stay close to a target duration, so
+concurrent traffic keeps getting the locks it needs.
+
+Inside an Alembic upgrade() use online_backfill() / create_index_online():
+
+    from app.utils.backfill import online_backfill, create_index_online
+
+    def upgrade() -> None:
+        op.add_column("employees", sa.Column("hire_year", sa.Integer, nullable=True))
+        online_backfill("0003_hire_year", "employees",
+                        "hire_year = CAST(strftime('%Y', hire_date) AS INTEGER)",
+                        where="hire_year IS NULL")
+        create_index_online("ix_employees_hire_year", "employees", ["hire_year"])
+
+The update must be idempotent for the rows it selects (re-running a batch
+must not change the outcome): that is what makes resuming safe.
+"""
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional, Sequence, Union
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, event, text, select
+from sqlalchemy.engine import Connection, Engine
+
+from ..config import setting
+
+logger = logging.getLogger("app.backfill")
+
+_metadata = MetaData()
+backfill_progress = Table(
+    "backfill_progress", _metadata,
+    Column("name", String(128), primary_key=True),
+    Column("table_name", String(64), nullable=False),
+    Column("last_key", BigInteger, nullable=True),
+    Column("rows_done", BigInteger, nullable=False, default=0),
+    Column("batches", Integer, nullable=False, default=0),
+    Column("updated_at", DateTime(timezone=True), nullable=True),
+    Column("finished_at", DateTime(timezone=True), nullable=True),
+)
+
+# update: SQL SET clause, or fn(connection, low_exclusive, high_inclusive) -> rows changed
+Update = Union[str, Callable[[Connection, Optional[int], int], int]]
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+def _load_progress(engine: Engine, name: str, table: str, restart: bool) -> Dict[str, object]:
+    backfill_progress.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        if restart:
+            conn.execute(backfill_progress.delete().where(backfill_progress.c.name == name))
+        row = conn.execute(select(backfill_progress).where(backfill_progress.c.name == name)).mappings().first()
+        if row is None:
+            conn.execute(backfill_progress.insert().values(name=name, table_name=table, rows_done=0, batches=0, updated_at=_now()))
+            return {"last_key": None, "rows_done": 0, "batches": 0, "finished_at": None}
+        return dict(row)
+
+def _next_upper_key(conn: Connection, table: str, key: str, last: Optional[int], where: Optional[str], size: int) -> Optional[int]:
+    # Keyset pagination: highest key of the next `size` rows after `last`
+    conds = [f"{key} > :last"] if last is not None else []
+    if where:
+        conds.append(f"({where})")
+    where_sql = f"WHERE {' AND '.join(conds)}" if conds else ""
+    sql = text(f"SELECT MAX({key}) FROM (SELECT {key} FROM {table} {where_sql} ORDER BY {key} LIMIT :n) batch")
+    return conn.execute(sql, {"last": last, "n": size}).scalar()
+
+def _apply_update(conn: Connection, table: str, key: str, update: Update, where: Optional[str],
+                  last: Optional[int], upper: int) -> int:
+    if callable(update):
+        return update(conn, last, upper)
+    conds = [f"{key} <= :upper"] + ([f"{key} > :last"] if last is not None else [])
+    if where:
+        conds.append(f"({where})")
+    result = conn.execute(text(f"UPDATE {table} SET {update} WHERE {' AND '.join(conds)}"), {"last": last, "upper": upper})
+    return max(result.rowcount, 0)
+
+def run_backfill(
+    engine: Engine,
+    name: str,
+    table: str,
+    update: Update,
+    where: Optional[str] = None,
+    key: str = "id",
+    batch_size: Optional[int] = None,
+    pause_s: Optional[float] = None,
+    target_batch_s: Optional[float] = None,
+    restart: bool = False,
+    on_progress: Optional[Callable[[Dict[str, object]], None]] = None,
+) -> Dict[str, object]:
+    """
+    Applies `update` to `table` in batches of increasing `key` (an integer, indexed column).
+    - where: optional filter; rows not matching it are neither counted nor updated
+    - batch_size / pause_s / target_batch_s: defaults from the `backfill` settings;
+      the batch size adapts (x0.5 .. x2) to keep each batch near target_batch_s
+    - restart=True: forget the saved progress of `name` and start from the first key
+    Returns {"name", "rows", "batches", "last_key", "seconds", "resumed"}.
+    """
+    batch_size = int(batch_size or setting("backfill", "batch_size", 5000))
+    pause_s = float(setting("backfill", "pause_ms", 50)) / 1000 if pause_s is None else pause_s
+    target_batch_s = float(setting("backfill", "target_batch_ms", 500)) / 1000 if target_batch_s is None else target_batch_s
+    max_batch = batch_size * 10
+
+    state = _load_progress(engine, name, table, restart)
+    if state["finished_at"] is not None:
+        logger.info("Backfill %s already finished; skipping", name)
+        return {"name": name, "rows": state["rows_done"], "batches": state["batches"], "last_key": state["last_key"],
+                "seconds": 0.0, "resumed": False}
+
+    last, rows, batches = state["last_key"], state["rows_done"], state["batches"]
+    resumed = last is not None
+    with engine.connect() as conn:
+        bounds = conn.execute(text(f"SELECT MIN({key}), MAX({key}) FROM {table}")).one()
+    low, high = (bounds[0] or 0), (bounds[1] or 0)
+    if resumed:
+        logger.info("Backfill %s resuming after %s=%s (%d rows done)", name, key, last, rows)
+
+    started = time.perf_counter()
+    while True:
+        batch_started = time.perf_counter()
+        with engine.begin() as conn:
+            upper = _next_upper_key(conn, table, key, last, where, batch_size)
+            if upper is None:
+                conn.execute(backfill_progress.update().where(backfill_progress.c.name == name)
+                             .values(finished_at=_now(), updated_at=_now()))
+                break
+            changed = _apply_update(conn, table, key, update, where, last, upper)
+            last, rows, batches = upper, rows + changed, batches + 1
+            conn.execute(backfill_progress.update().where(backfill_progress.c.name == name)
+                         .values(last_key=last, rows_done=rows, batches=batches, updated_at=_now()))
+
+        elapsed = time.perf_counter() - batch_started
+        progress = {
+            "name": name, "rows": rows, "batches": batches, "last_key": last, "batch_size": batch_size,
+            "percent": round(100 * (last - low) / (high - low), 1) if high > low else 100.0,
+        }
+        logger.info("Backfill %s: batch %d up to %s=%s, %d rows, %.1f%%", name, batches, key, last, rows, progress["percent"])
+        if on_progress is not None:
+            on_progress(progress)
+
+        # Throttle: give concurrent writers room, keep batches near the target duration
+        if target_batch_s:
+            if elapsed > target_batch_s and batch_size > 1:
+                batch_size = max(1, batch_size // 2)
+            elif elapsed < target_batch_s / 4:
+                batch_size = min(max_batch, batch_size * 2)
+        if pause_s:
+            time.sleep(pause_s)
+
+    seconds = time.perf_counter() - started
+    logger.info("Backfill %s finished: %d rows in %d batches (%.1fs)", name, rows, batches, seconds)
+    return {"name": name, "rows": rows, "batches": batches, "last_key": last, "seconds": seconds, "resumed": resumed}
+
+# ----------------------------
+# Alembic helpers
+# ----------------------------
+def online_backfill(name: str, table: str, update: Update, **kwargs) -> Dict[str, object]:
+    """
+    run_backfill() from inside an Alembic upgrade(). The migration's transaction is
+    committed first (autocommit block), so earlier DDL is visible and no lock is held
+    across batches; each batch then commits on its own connection, with the migration
+    connection's search_path (a Postgres tenant schema, see alembic/env.py).
+    """
+    from alembic import op
+
+    ctx = op.get_context()
+    if ctx.as_sql:
+        raise RuntimeError(f"Backfill {name} needs a live database connection (not available in --sql mode).")
+    with ctx.autocommit_block():
+        return run_backfill(_migration_engine(op.get_bind()), name, table, update, **kwargs)
+
+def _migration_engine(bind: Connection) -> Engine:
+    # New connections from the pool do not carry the SET search_path of the migration
+    # connection: re-apply it on every checkout, on an engine copy so the app's is untouched
+    engine = bind.engine
+    if not engine.dialect.name.startswith("postgresql"):
+        return engine
+    search_path = bind.exec_driver_sql("SHOW search_path").scalar()
+    engine = engine.execution_options()
+
+    @event.listens_for(engine, "engine_connect")
+    def _search_path(conn):
+        # On the driver connection, before SQLAlchemy begins the batch transaction
+        dbapi_conn = conn.connection.dbapi_connection
+        cur = dbapi_conn.cursor()
+        cur.execute(f"SET search_path TO {search_path}")
+        cur.close()
+        dbapi_conn.commit()
+
+    return engine
+
+def create_index_online(index_name: str, table: str, columns: Sequence[str], unique: bool = False):
+    """CREATE INDEX CONCURRENTLY on Postgres (outside a transaction); a plain CREATE INDEX elsewhere."""
+    from alembic import op
+
+    ctx = op.get_context()
+    if ctx.dialect.name.startswith("postgresql"):
+        with ctx.autocommit_block():
+            op.create_index(index_name, table, list(columns), unique=unique,
+                            postgresql_concurrently=True, if_not_exists=True)
+    else:
+        op.create_index(index_name, table, list(columns), unique=unique)
+
+def drop_index_online(index_name: str, table: str):
+    """DROP INDEX CONCURRENTLY on Postgres; a plain DROP INDEX elsewhere."""
+    from alembic import op
+
+    ctx = op.get_context()
+    if ctx.dialect.name.startswith("postgresql"):
+        with ctx.autocommit_block():
+            op.drop_index(index_name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        op.drop_index(index_name, table_name=table)
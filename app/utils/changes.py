@@ -0,0 +1,45 @@
+"""
+Monotonic per-table change versions.
+
+Every write transaction takes the next version of its table from
+`change_counter` and stamps it on all the rows it inserts or updates.
+The counter row stays locked until commit, so writers of the same table
+commit in version order: once a reader sees version N committed, no row
+with a version <= N can appear later. That makes `version` a safe
+watermark for incremental consumers (GET /changes/{table}).
+
+Bulk loads take their version first and write every row once with it, so
+writers of a table are serialized for the duration of a load. Short
+writers (/batch) pass `lock_timeout_ms` and fail fast with
+ChangeCounterBusy instead of queueing behind a load (Postgres only; on
+SQLite the load holds the database write lock anyway).
+"""
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+
+class ChangeCounterBusy(RuntimeError):
+    """The table's counter row stayed locked (by a bulk load) longer than the caller's lock timeout."""
+
+def next_change_version(db: Session, table: str, lock_timeout_ms: Optional[int] = None) -> int:
+    """Allocates the next version inside the caller's write transaction."""
+    if lock_timeout_ms and db.bind.dialect.name.startswith("postgresql"):
+        # SET LOCAL cannot take bind parameters; the value is an int
+        db.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+    try:
+        db.execute(text("UPDATE change_counter SET version = version + 1 WHERE table_name = :t"), {"t": table})
+    except OperationalError as e:
+        if getattr(e.orig, "sqlstate", None) == "55P03":  # lock_not_available
+            raise ChangeCounterBusy(f"{table} is being bulk loaded, retry later") from e
+        raise
+    version = db.execute(text("SELECT version FROM change_counter WHERE table_name = :t"), {"t": table}).scalar()
+    if version is None:
+        db.execute(text("INSERT INTO change_counter (table_name, version) VALUES (:t, 1)"), {"t": table})
+        version = 1
+    return version
+
+def current_watermark(db: Session, table: str) -> int:
+    """Last committed version of a table."""
+    return db.execute(text("SELECT version FROM change_counter WHERE table_name = :t"), {"t": table}).scalar() or 0
@@ -1,59 +1,71 @@
 import csv
-from datetime import timezone
 import io
 import os
-from typing import Dict, List
+from itertools import chain, islice
+from operator import itemgetter
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO, Union
 
-import requests
-import yaml
 from sqlalchemy import text
 from sqlalchemy.orm import Session
 
-from .types import TableName, EXPECTED_HEADERS
+from ..config import HEADER_MAPS, SETTINGS, setting
+from .types import TableName, EXPECTED_HEADERS, UNIQUE_COLUMNS, FOREIGN_KEYS
 from .validators import parse_date, parse_decimal
+from .timestamps import TimestampParser
+from .hiring_snapshot import notify_write
+from .changes import next_change_version
+from .keyindex import new_key_set
+from .rowbuffer import RowBuffer
+from .query_profiler import query_profiler
+from .table_swap import check_children, child_tables, replace_table
+
+# Write modes of ingest_rows / ingest_csv
+MODES = ("insert", "upsert", "replace")
 
 # ----------------------------
-# Configuration
+# Configuration (loaded in app/config.py)
 # ----------------------------
-CONFIG_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "..", "config")
-MAP_FILE = os.path.abspath(os.path.join(CONFIG_DIR, "header_mappings.yaml"))
-SET_FILE = os.path.abspath(os.path.join(CONFIG_DIR, "settings.yaml"))
-
-def _load_yaml(path: str) -> dict:
-    if not os.path.exists(path):
-        return {}
-    with open(path, "r", encoding="utf-8") as f:
-        return yaml.safe_load(f) or {}
-
-# Safe defaults if YAML files are missing
-HEADER_MAPS = _load_yaml(MAP_FILE)
-SETTINGS = {
-    "ingest": {
-        "use_copy_for_postgres": True,
-        "fail_fast_on_header_mismatch": False,
-        "upsert": ""  # "", "ignore", "update"
-    }
-}
-SETTINGS.update(_load_yaml(SET_FILE) or {})
+def _ingest_setting(key: str, default):
+    return setting("ingest", key, default)
 
 # ----------------------------
 # IO Utilities
 # ----------------------------
-def _open_source(source: str) -> io.StringIO:
+def _open_source(source: str) -> TextIO:
+    """
+    Returns a text stream over a URL, a local file or direct CSV content.
+    Files and URLs are streamed instead of being read fully into memory;
+    the caller is responsible for closing the returned stream.
+    """
     if source.startswith(("http://", "https://")):
-        r = requests.get(source, timeout=30)
+        import requests  # deferred: only URL sources need it
+
+        r = requests.get(source, timeout=30, stream=True)
         r.raise_for_status()
-        return io.StringIO(r.text)
+        r.raw.decode_content = True
+        return io.TextIOWrapper(r.raw, encoding=r.encoding or "utf-8", newline="")
     if os.path.isfile(source):
-        with open(source, "r", encoding="utf-8") as f:
-            return io.StringIO(f.read())
+        return open(source, "r", encoding="utf-8", newline="")
     # Direct content
     return io.StringIO(source)
 
+def open_upload(upload) -> TextIO:
+    """Wraps an UploadFile's spooled binary file in a streaming text reader."""
+    upload.file.seek(0)
+    return io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+
 def _clean_header(h: str) -> str:
     # Remove BOM, strip spaces, and lowercase
     return h.replace("\ufeff", "").strip().lower()
 
+def _chunks(rows: Iterable, size: int) -> Iterator[list]:
+    it = iter(rows)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
 # ----------------------------
 # Header normalization
 # ----------------------------
@@ -86,27 +98,163 @@ def _normalize_headers(headers: List[str], table: TableName) -> Dict[str, str]:
             raise ValueError(f"CSV headers missing {missing} for {table}. Got: {headers}")
     return mapping
 
+def _column_positions(headers: List[str], header_map: Dict[str, str]) -> Dict[str, int]:
+    # Standard column -> index in the raw CSV row. When several headers map to
+    # the same column, the last one wins (same as building a dict per row).
+    positions: Dict[str, int] = {}
+    for i, h in enumerate(headers):
+        std = header_map.get(h, h)
+        positions[std] = i
+    return positions
+
 # ----------------------------
 # Type coercion by table
 # ----------------------------
-def _coerce_row(table: TableName, row: Dict[str, str]) -> Dict[str, object]:
+class RowError(ValueError):
+    """Validation error for a single row, tagged with the offending column."""
+    def __init__(self, column: str, message: str):
+        super().__init__(message)
+        self.column = column
+
+def _is_null(v) -> bool:
+    return v is None or (isinstance(v, str) and v.strip() in ("", "NULL", "null"))
+
+def _to_int(row: Dict[str, object], col: str) -> int:
+    v = row[col]
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        raise RowError(col, f"{col} is not an integer: {v!r}")
+
+def _coerce_row(table: TableName, row: Dict[str, object], parse_ts=parse_date) -> Dict[str, object]:
+    """
+    Shared coercion and validation for one header-normalized row.
+    Used by every ingestion entry point so they all accept and reject the same rows.
+    parse_ts: hire_date parser; bulk callers pass a TimestampParser (same rules, faster).
+    Raises RowError naming the first invalid column.
+    """
     try:
         if table in ("departments", "jobs"):
-            row["id"] = int(row["id"])
+            label = "name" if table == "departments" else "title"
+            if row.get(label) is None: raise RowError(label, f"{label} is empty or null")
+            row["id"] = _to_int(row, "id")
             return row
 
         if table == "employees":
-            row["id"] = int(row["id"])
-            row["department_id"] = int(row["department_id"]) if row.get("department_id") not in (None, "",) else None
-            row["job_id"] = int(row["job_id"]) if row.get("job_id") not in (None, "",) else None
-            row["hire_date"] = parse_date(row["hire_date"])
-            # 'name' is already a string
+            # Validate FKs
+            if _is_null(row.get("department_id")): raise RowError("department_id", "department_id is empty or null")
+            if _is_null(row.get("job_id")): raise RowError("job_id", "job_id is empty or null")
+            row["department_id"] = _to_int(row, "department_id")
+            row["job_id"] = _to_int(row, "job_id")
+
+            # name
+            name = row.get("name") or ""
+            if not name.strip(): raise RowError("name", "name is empty")
+            row["name"] = name.strip()
+
+            # id
+            row["id"] = _to_int(row, "id")
+
+            # hire_date
+            hd = row.get("hire_date")
+            if hd is None or str(hd).strip() == "":
+                raise RowError("hire_date", "hire_date is empty or null.")
+            try:
+                row["hire_date"] = parse_ts(hd)  # datetime aware
+            except ValueError as e:
+                raise RowError("hire_date", str(e)) from e
             return row
 
-        return row
+        raise ValueError(f"Unsupported table: {table}")
     except KeyError as e:
         missing = str(e).strip("'")
-        raise ValueError(f"CSV missing required column '{missing}' for table '{table}'")
+        raise RowError(missing, f"CSV missing required column '{missing}' for table '{table}'")
+
+def _iter_numbered_rows(table: TableName, reader, positions: Dict[str, int]) -> Iterator[tuple]:
+    # (row number, header-normalized dict); start=2 because of header
+    required = [c for c in EXPECTED_HEADERS[table] if c in positions]
+    idxs = [positions[c] for c in required]
+    # Full-width rows: itemgetter + zip builds the dict in C; short rows pad with None
+    get = itemgetter(*idxs) if len(idxs) > 1 else (lambda raw: tuple(raw[i] for i in idxs))
+    width = max(idxs, default=-1) + 1
+    for idx, raw in enumerate((r for r in reader if r), start=2):
+        if len(raw) >= width:
+            yield idx, dict(zip(required, get(raw)))
+        else:
+            n = len(raw)
+            yield idx, {c: (raw[positions[c]] if positions[c] < n else None) for c in required}
+
+# ----------------------------
+# Intra-file duplicate keys
+# ----------------------------
+DUPLICATE_POLICIES = ("first_wins", "last_wins", "reject")
+
+class DuplicateKeyError(RowError):
+    """A unique key repeated inside the file (duplicates policy 'reject')."""
+
+class DuplicateResolver:
+    """
+    Resolves repeated unique keys (id, department name, job title) inside one file
+    before anything reaches the database.
+    - first_wins: keep the first row holding a key, drop later ones
+    - last_wins:  keep a row only if it is the last occurrence of each of its keys;
+                  accept() only records the occurrences, winners are picked when the
+                  buffered rows are replayed (see is_last)
+    - reject:     a repeated key is a row error (skipped with skip_invalid_rows)
+    Seen keys are tracked in app/utils/keyindex.py sets (bitmaps for integer ids).
+    """
+    def __init__(self, table: TableName, policy: str):
+        if policy not in DUPLICATE_POLICIES:
+            raise ValueError(f"Invalid duplicates policy. Use one of {list(DUPLICATE_POLICIES)}.")
+        self.policy = policy
+        self.columns = UNIQUE_COLUMNS[table]
+        self.seen = {c: new_key_set(c) for c in self.columns}
+        # last_wins: row number of the last occurrence, for repeated keys only
+        self.last_seen: Dict[str, Dict[object, int]] = {c: {} for c in self.columns}
+
+    def accept(self, idx: int, row: Dict[str, object]) -> bool:
+        if self.policy == "last_wins":
+            for c in self.columns:
+                if not self.seen[c].add(row[c]):
+                    self.last_seen[c][row[c]] = idx
+            return True
+        for c in self.columns:
+            if row[c] in self.seen[c]:
+                if self.policy == "reject":
+                    raise DuplicateKeyError(c, f"duplicate {c} {row[c]!r} in file")
+                return False
+        for c in self.columns:
+            self.seen[c].add(row[c])
+        return True
+
+    def is_last(self, idx: int, row: Dict[str, object]) -> bool:
+        return all(self.last_seen[c].get(row[c], idx) == idx for c in self.columns)
+
+def _iter_csv_rows(table: TableName, reader, positions: Dict[str, int], skip_invalid_rows: bool, stats: Dict[str, int],
+                   resolver: Optional[DuplicateResolver] = None) -> Iterator[tuple]:
+    parse_ts = TimestampParser(int(_ingest_setting("batch_size", 5000)))
+    return _resolve_rows(table, _iter_numbered_rows(table, reader, positions), skip_invalid_rows, stats, resolver, parse_ts)
+
+def _resolve_rows(table: TableName, numbered: Iterable[tuple], skip_invalid_rows: bool, stats: Dict[str, int],
+                  resolver: Optional[DuplicateResolver], parse_ts, where: str = "row") -> Iterator[tuple]:
+    # (row number, coerced row) for every (row number, normalized row) that passes coercion
+    # and the duplicates policy; shared by CSV and database ingestion
+    for idx, norm in numbered:
+        try:
+            row = _coerce_row(table, norm, parse_ts)
+            if resolver is not None and not resolver.accept(idx, row):
+                stats["duplicates"] += 1
+                continue
+            yield idx, row
+        except Exception as e:
+            # A rejected duplicate is counted once, in "duplicates"; "skipped" counts invalid rows
+            if isinstance(e, DuplicateKeyError):
+                stats["duplicates"] += 1
+            if skip_invalid_rows:
+                if not isinstance(e, DuplicateKeyError):
+                    stats["skipped"] += 1
+                continue
+            raise ValueError(f"Error in {where} {idx}: {e}") from e
 
 # ----------------------------
 # UPSERT helpers
@@ -116,13 +264,19 @@ def _conflict_target(table: TableName) -> str:
     return "id"
 
 def _update_set_clause(table: TableName) -> str:
-    cols = [c for c in EXPECTED_HEADERS[table] if c != "id"]
+    cols = [c for c in EXPECTED_HEADERS[table] if c != "id"] + ["change_version"]
     return ", ".join([f"{c}=excluded.{c}" for c in cols])
 
-def _build_upsert_sql(dialect: str, table: TableName, mode: str) -> str:
+def _param_marker(db: Session) -> str:
+    # Positional DBAPI placeholder for exec_driver_sql (qmark: sqlite3, format/pyformat: psycopg)
+    return "?" if db.bind.dialect.paramstyle == "qmark" else "%s"
+
+def _build_upsert_sql(dialect: str, table: TableName, mode: str, change_version: int = 0, marker: str = "?") -> str:
+    # Positional placeholders in EXPECTED_HEADERS order; change_version is the same for the
+    # whole transaction, so it is inlined as a literal
     cols = EXPECTED_HEADERS[table]
-    placeholders = ",".join([f":{c}" for c in cols])
-    col_list = ",".join(cols)
+    placeholders = ",".join([marker] * len(cols) + [str(int(change_version))])
+    col_list = ",".join(cols + ["change_version"])
     target = _conflict_target(table)
 
     if dialect.startswith("sqlite"):
@@ -142,190 +296,279 @@ def _build_upsert_sql(dialect: str, table: TableName, mode: str) -> str:
     # Other dialects
     return f"INSERT INTO {table} ({col_list}) VALUES ({placeholders})"
 
+# ----------------------------
+# Bulk writers
+# ----------------------------
+def _executemany(db: Session, sql: str, table: TableName, rows: Iterable[Dict[str, object]]) -> int:
+    # Positional tuples through exec_driver_sql: skips SQLAlchemy's per-row parameter
+    # processing, which costs more than the INSERT itself on SQLite
+    get = itemgetter(*EXPECTED_HEADERS[table])
+    connection = db.connection()
+    inserted = 0
+    for chunk in _chunks(rows, int(_ingest_setting("batch_size", 5000))):
+        connection.exec_driver_sql(sql, [get(r) for r in chunk])
+        inserted += len(chunk)
+    return inserted
+
+def _write_executemany(db: Session, table: TableName, rows: Iterable[Dict[str, object]], mode: str) -> int:
+    """Core INSERT/UPSERT, one executemany round trip per batch, in a single transaction."""
+    with db.begin():
+        version = next_change_version(db, table)
+        sql = _build_upsert_sql(db.bind.dialect.name, table, "update" if mode == "upsert" else "", version, _param_marker(db))
+        return _executemany(db, sql, table, rows)
+
+def _copy_rows(db: Session, target: str, table: TableName, rows: Iterable[Dict[str, object]], version: int) -> int:
+    # COPY FROM STDIN into `target` (a table with the columns of `table`), inside the caller's transaction
+    required = EXPECTED_HEADERS[table]
+    copy_sql = f"COPY {target} ({','.join(required + ['change_version'])}) FROM STDIN"
+    connection = db.connection()
+    raw_conn = connection.connection.driver_connection
+    inserted = 0
+    with query_profiler.timed(copy_sql, connection.engine) as timing, raw_conn.cursor() as cur:
+        with cur.copy(copy_sql) as copy:
+            for r in rows:
+                copy.write_row([r[c] for c in required] + [version])
+                inserted += 1
+        timing["rows"] = inserted
+    return inserted
+
+def _insert_rows(db: Session, target: str, table: TableName, rows: Iterable[Dict[str, object]], version: int) -> int:
+    # Plain batched executemany into `target`, inside the caller's transaction
+    cols = EXPECTED_HEADERS[table]
+    sql = (f"INSERT INTO {target} ({','.join(cols + ['change_version'])}) "
+           f"VALUES ({','.join([_param_marker(db)] * len(cols) + [str(int(version))])})")
+    return _executemany(db, sql, table, rows)
+
+def _write_replace(db: Session, table: TableName, rows: Iterable[Dict[str, object]]) -> int:
+    """
+    Full refresh: load into a shadow table (COPY on Postgres), build its indexes, check
+    FKs in bulk and swap it for the live table, all in one transaction (see table_swap.py).
+    """
+    use_copy = db.bind.dialect.name.startswith("postgresql") and _ingest_setting("use_copy_for_postgres", True)
+    load = _copy_rows if use_copy else _insert_rows
+    with db.begin():
+        version = next_change_version(db, table)
+        return replace_table(db, table, lambda target: load(db, target, table, rows, version))
+
+def _write_postgres_copy(db: Session, table: TableName, rows: Iterable[Dict[str, object]], mode: str) -> int:
+    """
+    Streams rows through COPY FROM STDIN (psycopg 3).
+    * insert: COPY directly into the target table
+    * upsert: COPY -> temp staging table -> INSERT ... ON CONFLICT DO UPDATE
+    """
+    cols = ",".join(EXPECTED_HEADERS[table] + ["change_version"])
+    target = f"staging_{table}" if mode == "upsert" else table
+    with db.begin():
+        version = next_change_version(db, table)
+        if mode == "upsert":
+            db.execute(text(f"CREATE TEMP TABLE {target} (LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"))
+
+        inserted = _copy_rows(db, target, table, rows, version)
+
+        if mode == "upsert" and inserted:
+            db.execute(text(f"""
+                INSERT INTO {table} ({cols})
+                SELECT {cols} FROM {target}
+                ON CONFLICT (id) DO UPDATE SET {_update_set_clause(table)}
+            """))
+    return inserted
+
+def _table_is_empty(db: Session, table: TableName) -> bool:
+    empty = db.execute(text(f"SELECT 1 FROM {table} LIMIT 1")).first() is None
+    db.rollback()  # the writers begin their own transaction
+    return empty
+
 # ----------------------------
 # Main ingestion logic
 # ----------------------------
-def ingest_csv(db: Session, table: TableName, content: str, skip_invalid_rows: bool = False, mode: str = "insert"):
+def ingest_rows(db: Session, table: TableName, rows: Iterable[Dict[str, object]], mode: str = "insert") -> int:
     """
-    Transactional ingestion from CSV.
-    - skip_invalid_rows=True: skip rows with invalid FKs/dates and count them.
-    - mode: "insert" (default) or "upsert".
-      * Postgres: upsert = COPY -> staging temp -> INSERT ... ON CONFLICT DO UPDATE
-      * SQLite:   upsert = INSERT ... ON CONFLICT(id) DO UPDATE
+    Writes already coerced rows with the fastest writer for the dialect.
+    Rows are consumed lazily; the whole load is a single transaction and
+    every written row is stamped with one new change_version.
+    mode "replace" swaps the table for exactly these rows (_write_replace).
+    A load that would change nothing (no rows; for replace, no rows and an
+    already empty table) opens no transaction and takes no version.
     """
+    if mode not in MODES:
+        raise ValueError("Invalid mode. Use 'insert', 'upsert' or 'replace'.")
+
+    rows = iter(rows)
+    first = next(rows, None)
+    if first is None:
+        if mode != "replace" or _table_is_empty(db, table):
+            return 0
+    else:
+        rows = chain((first,), rows)
+
     dialect = db.bind.dialect.name
-    sio = io.StringIO(content)
-    reader = csv.reader(sio)
+    if mode == "replace":
+        inserted = _write_replace(db, table, rows)
+    elif dialect.startswith("postgresql") and _ingest_setting("use_copy_for_postgres", True):
+        inserted = _write_postgres_copy(db, table, rows, mode)
+    else:
+        inserted = _write_executemany(db, table, rows, mode)
+    notify_write(db, table, mode)
+    return inserted
+
+def _open_csv(table: TableName, content: Union[str, TextIO]):
+    stream = io.StringIO(content) if isinstance(content, str) else content
+    reader = csv.reader(stream)
     headers = next(reader, None)
     if not headers:
         raise ValueError("CSV is empty or missing headers.")
-
     header_map = _normalize_headers(headers, table)
+    return reader, _column_positions(headers, header_map)
+
+def _replay(buffer: RowBuffer, resolver: DuplicateResolver, stats: Dict[str, int]) -> Iterator[Dict[str, object]]:
+    last_wins = resolver.policy == "last_wins"
+    for idx, row in buffer:
+        if last_wins and not resolver.is_last(idx, row):
+            stats["duplicates"] += 1
+            continue
+        yield row
+
+def ingest_csv(db: Session, table: TableName, content: Union[str, TextIO], skip_invalid_rows: bool = False, mode: str = "insert",
+               duplicates: Optional[str] = None):
+    """
+    Transactional, streaming ingestion from CSV.
+    - content: CSV text or a text stream (file, upload); streams are never read fully into memory.
+    - skip_invalid_rows=True: skip rows with invalid FKs/dates and count them.
+    - mode: "insert" (default), "upsert" or "replace".
+      * Postgres: insert = COPY; upsert = COPY -> staging temp -> INSERT ... ON CONFLICT DO UPDATE
+      * SQLite:   insert/upsert = batched executemany (INSERT ... ON CONFLICT(id) DO UPDATE)
+      * replace:  the file becomes the table's full content (shadow table load + atomic swap)
+    - duplicates: policy for keys repeated inside the file, "first_wins" | "last_wins" | "reject"
+      (default: ingest.duplicates setting).
+    The whole file is parsed and validated before the write transaction starts. Coerced
+    rows are kept in a RowBuffer that spills to disk beyond ingest.memory_budget_mb.
+    """
+    if mode not in MODES:
+        raise ValueError("Invalid mode. Use 'insert', 'upsert' or 'replace'.")
+    policy = duplicates or _ingest_setting("duplicates", "reject")
+    resolver = DuplicateResolver(table, policy)
+
+    reader, positions = _open_csv(table, content)
+    stats = {"skipped": 0, "duplicates": 0}
+    rows = _iter_csv_rows(table, reader, positions, skip_invalid_rows, stats, resolver)
+    inserted = ingest_resolved_rows(db, table, rows, resolver, stats, mode)
+    return {"inserted": inserted, **stats}
+
+def ingest_resolved_rows(db: Session, table: TableName, rows: Iterable[tuple], resolver: DuplicateResolver,
+                         stats: Dict[str, int], mode: str = "insert") -> int:
+    """
+    Buffers the (row number, coerced row) pairs of a whole source in a RowBuffer (spills to
+    disk beyond ingest.memory_budget_mb), then writes the rows the duplicates policy keeps.
+    """
+    budget = int(float(_ingest_setting("memory_budget_mb", 64)) * 1024 * 1024)
+    with RowBuffer(table, budget, _ingest_setting("spill_dir", None)) as buffer:
+        for idx, row in rows:
+            buffer.append(idx, row)
+        return ingest_rows(db, table, _replay(buffer, resolver, stats), mode=mode)
 
-    # 1) Parsing + coercion + skipped row count
-    sio.seek(0)
-    dict_reader = csv.DictReader(sio)
-    normalized_rows: List[Dict[str, object]] = []
-    errors = 0
-
-    required = EXPECTED_HEADERS[table]
-
-    for idx, r in enumerate(dict_reader, start=2):  # start=2 because of header
-        try:
-            norm = {header_map.get(k, k): v for k, v in r.items()}
-            norm = {k: v for k, v in norm.items() if k in required}
-
-            # Table-specific coercion
-            if table in ("departments", "jobs"):
-                norm["id"] = int(norm["id"])
-            elif table == "employees":
-                # Validate FKs
-                dep = norm.get("department_id")
-                job = norm.get("job_id")
-                if dep in (None, "", "NULL", "null"): raise ValueError("department_id is empty or null")
-                if job in (None, "", "NULL", "null"): raise ValueError("job_id is empty or null")
-                norm["department_id"] = int(dep)
-                norm["job_id"] = int(job)
-
-                # name
-                name = norm.get("name", "")
-                if not name or not name.strip(): raise ValueError("name is empty")
-                norm["name"] = name.strip()
-
-                # id
-                norm["id"] = int(norm["id"])
-
-                # hire_date
-                hd = norm.get("hire_date")
-                if hd is None or str(hd).strip() == "":
-                    raise ValueError("hire_date is empty or null.")
-                norm["hire_date"] = parse_date(hd)  # datetime aware
-            else:
-                raise ValueError(f"Unsupported table: {table}")
-
-            normalized_rows.append(norm)
-
-        except Exception as e:
-            if skip_invalid_rows:
-                errors += 1
-                continue
-            raise ValueError(f"Error in row {idx}: {e}") from e
-
-    if not normalized_rows:
-        # Nothing to insert
-        return {"inserted": 0, "skipped": errors}
-
-    # 2) INSERT / UPSERT by dialect
-    if dialect.startswith("postgresql"):
-        if mode == "insert":
-            # === Direct COPY to target table ===
-            # If any rows have NULLs in NOT NULL columns, COPY would fail.
-            # Filter them out if skip_invalid_rows=True
-            def row_ok(r: Dict[str, object]) -> bool:
-                return all(r.get(col) is not None for col in required)
-
-            if skip_invalid_rows:
-                valid_rows = [r for r in normalized_rows if row_ok(r)]
-                skipped_by_nulls = len(normalized_rows) - len(valid_rows)
-                errors += skipped_by_nulls
+# ----------------------------
+# Dry run (validate only)
+# ----------------------------
+# Bind parameters per IN (...) list; larger value sets are looked up in several queries
+MAX_IN_PARAMS = 500
+
+def _existing_keys(db: Session, table: TableName, column: str, values: List[object]) -> Dict[object, int]:
+    # value -> id of the row already holding it in the target table
+    found = {}
+    for part in _chunks(values, MAX_IN_PARAMS):
+        params = {f"v{i}": v for i, v in enumerate(part)}
+        in_list = ",".join(f":{k}" for k in params)
+        rows = db.execute(text(f"SELECT {column}, id FROM {table} WHERE {column} IN ({in_list})"), params)
+        found.update((v, i) for v, i in rows)
+    return found
+
+def validate_csv(db: Session, table: TableName, content: Union[str, TextIO], report: TextIO, mode: str = "insert") -> Dict[str, int]:
+    """
+    Dry run: streams the CSV through header normalization, coercion and FK/uniqueness
+    checks without writing anything.
+    - Every problem is written to `report` as a CSV line (row, column, error).
+    - Rows are checked in batches against the database; only the referenced FK ids
+      and the keys already seen in the file (see keyindex.py) are kept in memory;
+      FK ids are looked up per batch, only the distinct ids the batch references.
+    - mode "replace" also checks that no child row would be orphaned; that is a file-level
+      error (empty row number) counted in "file_errors".
+    Returns {"rows": checked, "valid": ok, "failed": failing rows, "file_errors": ...}.
+    """
+    if mode not in MODES:
+        raise ValueError("Invalid mode. Use 'insert', 'upsert' or 'replace'.")
+
+    reader, positions = _open_csv(table, content)
+    out = csv.writer(report)
+    out.writerow(["row", "column", "error"])
+
+    unique_cols = UNIQUE_COLUMNS[table]
+    seen = {col: new_key_set(col) for col in unique_cols}
+    stats = {"rows": 0, "valid": 0, "failed": 0, "file_errors": 0}
+    batch_size = int(_ingest_setting("batch_size", 5000))
+    parse_ts = TimestampParser(batch_size)
+    # replace: the valid ids go to a temp table so child rows can be checked with the same
+    # anti-join as the real replace (table_swap.check_children); rolled back at the end
+    new_ids = f"{table}__dry_run" if mode == "replace" and child_tables(table) else None
+    if new_ids:
+        db.execute(text(f"CREATE TEMP TABLE {new_ids} (id BIGINT PRIMARY KEY)"))
+    try:
+        _validate_chunks(db, table, reader, positions, mode, out, seen, stats, batch_size, parse_ts, new_ids)
+        if new_ids:
+            try:
+                check_children(db, table, new_ids)
+            except ValueError as e:
+                out.writerow(["", "id", str(e)])
+                stats["file_errors"] += 1
+    finally:
+        if new_ids:
+            # pysqlite runs DDL outside the transaction: drop the table explicitly as well
+            db.rollback()
+            db.execute(text(f"DROP TABLE IF EXISTS {new_ids}"))
+            db.commit()
+    return stats
+
+def _validate_chunks(db: Session, table: TableName, reader, positions: Dict[str, int], mode: str, out, seen,
+                     stats: Dict[str, int], batch_size: int, parse_ts: TimestampParser, new_ids: Optional[str]):
+    unique_cols = UNIQUE_COLUMNS[table]
+    for chunk in _chunks(_iter_numbered_rows(table, reader, positions), batch_size):
+        coerced = []
+        for idx, norm in chunk:
+            stats["rows"] += 1
+            try:
+                coerced.append((idx, _coerce_row(table, norm, parse_ts)))
+            except RowError as e:
+                out.writerow([idx, e.column, str(e)])
+                stats["failed"] += 1
+
+        fk_ids = {
+            col: set(_existing_keys(db, ref, "id", list({r[col] for _, r in coerced if r[col] is not None})))
+            for col, ref in FOREIGN_KEYS[table].items()
+        }
+        # replace drops the current rows, so only repeats inside the file conflict
+        existing = {
+            col: {} if mode == "replace" else _existing_keys(db, table, col, list({r[col] for _, r in coerced}))
+            for col in unique_cols
+        }
+        valid_ids = []
+        for idx, r in coerced:
+            errors = []
+            for col, ids in fk_ids.items():
+                if r[col] not in ids:
+                    errors.append((col, f"{col} {r[col]} does not exist in {FOREIGN_KEYS[table][col]}"))
+            for col in unique_cols:
+                v = r[col]
+                if not seen[col].add(v):
+                    errors.append((col, f"duplicate {col} {v!r} in file"))
+                    continue
+                owner = existing[col].get(v)
+                if owner is not None and (mode == "insert" or owner != r["id"]):
+                    errors.append((col, f"{col} {v!r} already exists in {table}"))
+            if errors:
+                stats["failed"] += 1
+                for col, msg in errors:
+                    out.writerow([idx, col, msg])
             else:
-                # Strict validation
-                bad_idx = [i for i, r in enumerate(normalized_rows) if not row_ok(r)]
-                if bad_idx:
-                    raise ValueError(f"{len(bad_idx)} rows have NULLs in NOT NULL columns. Use skip_invalid_rows=true.")
-                valid_rows = normalized_rows
-
-            # COPY
-            out = io.StringIO()
-            writer = csv.DictWriter(out, fieldnames=required)
-            writer.writeheader()
-            for r in valid_rows:
-                r2 = dict(r)
-                if "hire_date" in r2 and r2["hire_date"] is not None:
-                    r2["hire_date"] = r2["hire_date"].astimezone(timezone.utc).isoformat()
-                writer.writerow(r2)
-            out.seek(0)
-
-            connection = db.connection()
-            raw_conn = connection.connection
-            with db.begin():
-                with raw_conn.cursor() as cur:
-                    cur.copy_expert(
-                        f"COPY {table} ({','.join(required)}) FROM STDIN WITH CSV HEADER",
-                        out
-                    )
-            return {"inserted": len(valid_rows), "skipped": errors}
-
-        elif mode == "upsert":
-            # === COPY to STAGING + MERGE (ON CONFLICT) ===
-            cols = ",".join(required)
-            with db.begin():
-                db.execute(text(f"CREATE TEMP TABLE staging_{table} AS SELECT * FROM {table} WITH NO DATA;"))
-
-                # COPY to staging
-                out = io.StringIO()
-                writer = csv.DictWriter(out, fieldnames=required)
-                writer.writeheader()
-                valid_rows = []
-                for r in normalized_rows:
-                    if all(r.get(c) is not None for c in required):
-                        r2 = dict(r)
-                        if "hire_date" in r2 and r2["hire_date"] is not None:
-                            r2["hire_date"] = r2["hire_date"].astimezone(timezone.utc).isoformat()
-                        writer.writerow(r2)
-                        valid_rows.append(r)
-                    elif not skip_invalid_rows:
-                        raise ValueError("Row has NULLs in NOT NULL columns. Use skip_invalid_rows=true or clean the CSV.")
-                    else:
-                        errors += 1
-                out.seek(0)
-
-                connection = db.connection()
-                raw_conn = connection.connection
-                with raw_conn.cursor() as cur:
-                    cur.copy_expert(
-                        f"COPY staging_{table} ({cols}) FROM STDIN WITH CSV HEADER",
-                        out
-                    )
-
-                # UPSERT (assuming PK = id)
-                set_cols = [c for c in required if c != "id"]
-                set_clause = ", ".join([f"{c}=excluded.{c}" for c in set_cols])
-                db.execute(text(f"""
-                    INSERT INTO {table} ({cols})
-                    SELECT {cols} FROM staging_{table}
-                    ON CONFLICT (id) DO UPDATE SET {set_clause}
-                """))
-                db.execute(text(f"DROP TABLE staging_{table};"))
-
-            return {"inserted": len(valid_rows), "skipped": errors}
-
-        else:
-            raise ValueError("Invalid mode. Use 'insert' or 'upsert'.")
-
-    else:
-        # === SQLite ===
-        cols = ",".join(required)
-        placeholders = ",".join([f":{c}" for c in required])
-
-        if mode == "insert":
-            with db.begin():
-                db.execute(text(f"INSERT INTO {table} ({cols}) VALUES ({placeholders})"), normalized_rows)
-            return {"inserted": len(normalized_rows), "skipped": errors}
-
-        elif mode == "upsert":
-            # ON CONFLICT(id) DO UPDATE
-            set_cols = [c for c in required if c != "id"]
-            set_clause = ", ".join([f"{c}=excluded.{c}" for c in set_cols])
-            with db.begin():
-                db.execute(
-                    text(f"""
-                        INSERT INTO {table} ({cols}) VALUES ({placeholders})
-                        ON CONFLICT(id) DO UPDATE SET {set_clause}
-                    """),
-                    normalized_rows
-                )
-            return {"inserted": len(normalized_rows), "skipped": errors}
-
-        else:
-            raise ValueError("Invalid mode. Use 'insert' or 'upsert'.")
+                stats["valid"] += 1
+                valid_ids.append({"id": r["id"]})
+        if new_ids and valid_ids:
+            db.execute(text(f"INSERT INTO {new_ids} (id) VALUES (:id)"), valid_ids)
@@ -0,0 +1,123 @@
+"""
+Database-to-database ingestion.
+
+Reads the departments/jobs/employees tables of another database (a SQLite
+file path or any SQLAlchemy URL) with a server-side cursor, maps its column
+names through the same header aliases as CSV ingestion, and streams the
+typed rows through the same coercion, duplicates policy and RowBuffer as a
+CSV file into the bulk writers (COPY / executemany) of the target.
+Tables are loaded in FK dependency order, one transaction per table.
+"""
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence
+from urllib.parse import quote
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from .csv_ingest import (DuplicateResolver, _column_positions, _ingest_setting, _normalize_headers, _resolve_rows,
+                         ingest_resolved_rows)
+from .timestamps import TimestampParser
+from .types import EXPECTED_HEADERS, FOREIGN_KEYS, TableName
+
+FETCH_SIZE = 10_000
+
+def load_order(tables: Sequence[str]) -> List[str]:
+    """Tables sorted so that every table comes after the tables its FKs reference."""
+    ordered: List[str] = []
+    def visit(t: str):
+        if t in ordered:
+            return
+        for ref in FOREIGN_KEYS[t].values():
+            if ref in tables:
+                visit(ref)
+        ordered.append(t)
+    for t in tables:
+        visit(t)
+    return ordered
+
+def open_source_engine(source: str) -> Engine:
+    """SQLAlchemy URL as given; a plain path is opened as a read-only SQLite file."""
+    if "://" in source:
+        return create_engine(source)
+    if not os.path.isfile(source):
+        raise ValueError(f"Source database not found: {source}")
+    return create_engine(f"sqlite:///file:{quote(os.path.abspath(source))}?mode=ro&uri=true")
+
+class _TypedTimestamps:
+    # Drivers return hire_date as text (SQLite) or as date/datetime (Postgres, MySQL)
+    def __init__(self):
+        self._text = TimestampParser(int(_ingest_setting("batch_size", 5000)))
+
+    def __call__(self, value) -> datetime:
+        if isinstance(value, datetime):
+            dt = value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+        elif isinstance(value, date):
+            dt = datetime(value.year, value.month, value.day, tzinfo=timezone.utc)
+        else:
+            return self._text(str(value))
+        if dt > self._text.now:
+            raise ValueError(f"Future hire_date is not allowed: {dt.isoformat()}")
+        return dt
+
+def _source_table(available: List[str], table: str) -> Optional[str]:
+    by_lower = {t.lower(): t for t in available}
+    return by_lower.get(table)
+
+def _iter_source_rows(src: Engine, source_table: str, table: TableName, skip_invalid_rows: bool,
+                      stats: Dict[str, int], resolver: DuplicateResolver) -> Iterator[tuple]:
+    columns = [c["name"] for c in inspect(src).get_columns(source_table)]
+    header_map = _normalize_headers(columns, table)
+    positions = _column_positions(columns, header_map)
+    required = [c for c in EXPECTED_HEADERS[table] if c in positions]
+
+    # Only the mapped columns are read; raw driver values, no type processing on the source side
+    quote_id = src.dialect.identifier_preparer.quote
+    selected = sorted(set(positions[c] for c in required))
+    select_list = ", ".join(quote_id(columns[i]) for i in selected)
+    slot = {c: selected.index(positions[c]) for c in required}
+
+    with src.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=FETCH_SIZE).execute(
+            text(f"SELECT {select_list} FROM {quote_id(source_table)}")
+        )
+        numbered = ((idx, {c: raw[slot[c]] for c in required}) for idx, raw in enumerate(result, start=1))
+        yield from _resolve_rows(table, numbered, skip_invalid_rows, stats, resolver, _TypedTimestamps(),
+                                 where=f"{source_table} row")
+
+def ingest_database(db: Session, source: str, tables: Optional[Sequence[str]] = None, mode: str = "insert",
+                    skip_invalid_rows: bool = False, duplicates: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Copies `tables` (default: all) from the source database into the target session's database.
+    - source: SQLite file path (opened read-only) or SQLAlchemy URL
+    - mode: "insert", "upsert" or "replace" (as ingest_rows)
+    - duplicates: policy for keys repeated inside a source table, as for CSV files
+      (default: ingest.duplicates setting)
+    Returns {table: {"inserted", "skipped", "duplicates"}} in load order. Tables absent from the
+    source are reported with "missing": True. A failing table stops the load; earlier tables stay committed.
+    """
+    tables = list(tables or EXPECTED_HEADERS)
+    unknown = [t for t in tables if t not in EXPECTED_HEADERS]
+    if unknown:
+        raise ValueError(f"Unknown tables {unknown}. Use {list(EXPECTED_HEADERS)}.")
+    policy = duplicates or _ingest_setting("duplicates", "reject")
+
+    src = open_source_engine(source)
+    try:
+        available = inspect(src).get_table_names()
+        results: Dict[str, Dict[str, int]] = {}
+        for table in load_order(tables):
+            source_table = _source_table(available, table)
+            if source_table is None:
+                results[table] = {"inserted": 0, "skipped": 0, "duplicates": 0, "missing": True}
+                continue
+            stats = {"skipped": 0, "duplicates": 0}
+            resolver = DuplicateResolver(table, policy)
+            rows = _iter_source_rows(src, source_table, table, skip_invalid_rows, stats, resolver)
+            inserted = ingest_resolved_rows(db, table, rows, resolver, stats, mode)
+            results[table] = {"inserted": inserted, **stats}
+        return results
+    finally:
+        src.dispose()
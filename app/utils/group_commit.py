@@ -0,0 +1,190 @@
+"""
+Group commit for the small JSON /batch writes.
+
+Concurrent /departments|/jobs|/employees batch requests for the same table and
+engine (tenant engines are distinct even when they share a URL) are coalesced: the first caller becomes the leader, waits up to
+`group_commit.max_wait_ms` (or until `max_rows` are queued) for others to join,
+then writes every queued batch with one bulk INSERT and one commit. Callers
+that arrive while a flush is running queue up and are written by the next
+leader, so under load batches grow without any extra delay.
+
+Every caller still gets its own outcome: if the combined write fails, the
+batch is retried in one transaction with a SAVEPOINT per caller, so only the
+callers whose rows are invalid (e.g. a duplicate id) get the error.
+
+Taking the table's change version waits at most `group_commit.lock_timeout_ms`
+(Postgres): while a bulk load of the table holds the counter, callers get
+ChangeCounterBusy (503 + Retry-After) instead of queueing behind it.
+"""
+import threading
+import time
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import setting
+from ..tenancy import bind_key
+from .changes import ChangeCounterBusy, next_change_version
+from .hiring_snapshot import notify_write
+
+class _Pending:
+    __slots__ = ("rows", "done", "lead", "error")
+
+    def __init__(self, rows: List[Dict[str, object]]):
+        self.rows = rows
+        self.done = False
+        self.lead = False  # promoted to leader by the previous flush
+        self.error: Optional[BaseException] = None
+
+class _Group:
+    __slots__ = ("cond", "queue", "queued_rows", "busy")
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.queue: List[_Pending] = []
+        self.queued_rows = 0
+        self.busy = False  # a leader is gathering or flushing
+
+class GroupCommitter:
+    def __init__(self, max_wait_ms: float = 2.0, max_rows: int = 5000, enabled: bool = True, lock_timeout_ms: int = 2000):
+        self.max_wait = max_wait_ms / 1000
+        self.lock_timeout_ms = lock_timeout_ms
+        self.max_rows = max_rows
+        self.enabled = enabled
+        # bind_key(engine) -> table -> group; the leader writes through its own session, so
+        # only requests on the very same engine (and schema) may ever share a flush
+        self._groups: Dict[Tuple[int, Optional[str]], Dict[str, _Group]] = {}
+        self._lock = threading.Lock()
+        self.flushes = 0
+        self.requests = 0
+
+    def _group(self, db: Session, table: str) -> _Group:
+        engine = db.get_bind()
+        key = bind_key(engine)
+        with self._lock:
+            tables = self._groups.get(key)
+            if tables is None:
+                tables = self._groups[key] = {}
+                # id() values are reused after collection: forget the engine's groups with it
+                weakref.finalize(engine, self._groups.pop, key, None)
+            group = tables.get(table)
+            if group is None:
+                group = tables[table] = _Group()
+            return group
+
+    def submit(self, db: Session, table: str, model, rows: List[Dict[str, object]]) -> int:
+        """Writes `rows` (possibly together with concurrent callers'); returns the count or raises."""
+        me = _Pending(rows)
+        if not self.enabled:
+            self._flush(db, table, model, [me])
+            return self._result(me)
+
+        group = self._group(db, table)
+        with group.cond:
+            group.queue.append(me)
+            group.queued_rows += len(rows)
+            group.cond.notify_all()
+            if group.busy:
+                while not (me.done or me.lead):
+                    group.cond.wait()
+                if me.done:
+                    return self._result(me)
+            else:
+                group.busy = True
+                # New leader: gather window (a promoted leader flushes at once, its queue waited already)
+                deadline = time.monotonic() + self.max_wait
+                while group.queued_rows < self.max_rows:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    group.cond.wait(remaining)
+            batch = self._take(group)
+
+        try:
+            self._flush(db, table, model, batch)
+        except Exception as e:
+            # Unexpected failure outside the per-caller handling: every caller of the batch gets it
+            for pending in batch:
+                pending.error = pending.error or e
+        finally:
+            # Always hand over, or the followers and every later caller would wait forever
+            with group.cond:
+                for pending in batch:
+                    pending.done = True
+                if group.queue:
+                    group.queue[0].lead = True
+                else:
+                    group.busy = False
+                group.cond.notify_all()
+        return self._result(me)
+
+    def _take(self, group: _Group) -> List[_Pending]:
+        # FIFO up to max_rows (the head, i.e. the leader itself, is always taken)
+        batch, rows = [], 0
+        while group.queue and (not batch or rows + len(group.queue[0].rows) <= self.max_rows):
+            pending = group.queue.pop(0)
+            batch.append(pending)
+            rows += len(pending.rows)
+        group.queued_rows -= rows
+        return batch
+
+    @staticmethod
+    def _result(pending: _Pending) -> int:
+        if pending.error is not None:
+            raise pending.error
+        return len(pending.rows)
+
+    # ----------------------------
+    # Writing
+    # ----------------------------
+    def _flush(self, db: Session, table: str, model, batch: List[_Pending]):
+        self.flushes += 1
+        self.requests += len(batch)
+        try:
+            with db.begin():
+                version = next_change_version(db, table, self.lock_timeout_ms)
+                payload = [r for p in batch for r in p.rows]
+                for r in payload:
+                    r["change_version"] = version
+                db.bulk_insert_mappings(model, payload)
+        except Exception as e:
+            if len(batch) == 1 or isinstance(e, ChangeCounterBusy):
+                for pending in batch:
+                    pending.error = e
+                return
+            self._flush_isolated(db, table, model, batch)
+        if any(p.error is None for p in batch):
+            notify_write(db, table)
+
+    def _flush_isolated(self, db: Session, table: str, model, batch: List[_Pending]):
+        # One transaction, one SAVEPOINT per caller: bad batches fail alone
+        try:
+            with db.begin():
+                version = next_change_version(db, table, self.lock_timeout_ms)
+                for pending in batch:
+                    for r in pending.rows:
+                        r["change_version"] = version
+                    try:
+                        with db.begin_nested():
+                            db.bulk_insert_mappings(model, pending.rows)
+                    except Exception as e:
+                        pending.error = e
+        except Exception as e:
+            for pending in batch:
+                pending.error = pending.error or e
+
+    def status(self) -> Dict[str, object]:
+        return {
+            "enabled": self.enabled,
+            "flushes": self.flushes,
+            "requests": self.requests,
+            "avg_requests_per_flush": round(self.requests / self.flushes, 2) if self.flushes else 0.0,
+        }
+
+group_commit = GroupCommitter(
+    max_wait_ms=float(setting("group_commit", "max_wait_ms", 2)),
+    max_rows=int(setting("group_commit", "max_rows", 5000)),
+    enabled=bool(setting("group_commit", "enabled", True)),
+    lock_timeout_ms=int(setting("group_commit", "lock_timeout_ms", 2000)),
+)
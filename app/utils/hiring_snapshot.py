@@ -0,0 +1,283 @@
+"""
+In-process columnar snapshot of `employees` for ad-hoc hiring aggregations.
+
+The snapshot keeps one NumPy array per column (hire day, year, month,
+department_id, job_id) plus small id -> name dictionaries for departments
+and jobs, and answers group-by queries with vectorized counting.
+Every use compares the committed change versions of employees, departments
+and jobs (one small read of change_counter) with the ones loaded, so writes
+from other workers or processes are picked up too; a refresh fetches only
+the rows whose change_version is above the last one loaded. notify_write
+just forces the check for writes made by this process. The SQL queries in
+routers/metrics.py remain the fallback and the reference.
+"""
+import threading
+import weakref
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import setting
+from ..tenancy import bind_key
+from .changes import current_watermark
+
+# numpy is optional and imported on first use (see _load_numpy) to keep startup fast
+np = None
+_numpy_checked = False
+
+GROUP_KEYS = ("year", "quarter", "month", "department", "job")
+UNKNOWN = "(Unknown)"
+FETCH_SIZE = 50_000
+# Value ranges up to this size are counted with bincount/lookup tables instead of sorting
+DENSE_RANGE = 1 << 22
+
+def _load_numpy() -> bool:
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:  # callers fall back to SQL
+            np = None
+        _numpy_checked = True
+    return np is not None
+
+def snapshot_enabled() -> bool:
+    return bool(setting("analytics", "snapshot", True)) and _load_numpy()
+
+# ----------------------------
+# Snapshot
+# ----------------------------
+class HiringSnapshot:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cols = self._empty()
+        self.version = 0  # change_version watermark of the loaded rows
+        self.dim_versions = (-1, -1)  # (departments, jobs) watermarks of the loaded names
+        self.departments: Dict[int, str] = {}
+        self.jobs: Dict[int, str] = {}
+        self.loaded = False
+        self.dirty = True
+        self.full_reload = True
+        self.dims_dirty = True
+
+    @staticmethod
+    def _empty() -> Dict[str, "np.ndarray"]:
+        return {
+            "id": np.empty(0, np.int64),
+            "day": np.empty(0, np.int64),
+            "year": np.empty(0, np.int32),
+            "month": np.empty(0, np.int32),
+            "department_id": np.empty(0, np.int64),
+            "job_id": np.empty(0, np.int64),
+        }
+
+    def __len__(self) -> int:
+        return len(self._cols["id"])
+
+    def mark_dirty(self, table: str, full: bool = False):
+        if table == "employees":
+            self.dirty = True
+            self.full_reload = self.full_reload or full
+        else:
+            self.dims_dirty = True
+
+    def _stale(self, marks: Dict[str, int]) -> bool:
+        return (self.dirty or self.dims_dirty or not self.loaded or marks.get("employees", 0) != self.version
+                or (marks.get("departments", 0), marks.get("jobs", 0)) != self.dim_versions)
+
+    def ensure_fresh(self, db: Session):
+        # The watermarks come from the session's own database: a lagging read replica
+        # is caught up with once its change_counter advances
+        marks = _watermarks(db)
+        if not self._stale(marks):
+            return
+        with self._lock:
+            dims = (marks.get("departments", 0), marks.get("jobs", 0))
+            if self.dims_dirty or dims != self.dim_versions:
+                self.dims_dirty = False
+                self.dim_versions = dims
+                self.departments = dict(db.execute(text("SELECT id, name FROM departments")).all())
+                self.jobs = dict(db.execute(text("SELECT id, title FROM jobs")).all())
+            if self.dirty or not self.loaded or marks.get("employees", 0) != self.version:
+                full, self.dirty, self.full_reload = (self.full_reload or not self.loaded), False, False
+                self._refresh(db, full)
+
+    def _refresh(self, db: Session, full: bool):
+        watermark = current_watermark(db, "employees")
+        if not full:
+            # A table replace (possibly by another process) rewrites every row with a new version,
+            # and a watermark going back means another database: both need a full reload
+            oldest = db.execute(text("SELECT MIN(change_version) FROM employees")).scalar()
+            full = watermark < self.version or oldest is None or oldest > self.version
+        if full:
+            ids, new = self._fetch(db, None, watermark)
+            cols = new
+        else:
+            ids, new = self._fetch(db, self.version, watermark)
+            # Changed rows replace their previous version (or drop out when hire_date became NULL)
+            keep = ~np.isin(self._cols["id"], ids)
+            cols = {k: np.concatenate([self._cols[k][keep], new[k]]) for k in self._cols}
+        self._cols = cols
+        self.version = watermark
+        self.loaded = True
+
+    def _fetch(self, db: Session, since_version: Optional[int], watermark: int):
+        """(ids of all fetched rows, columns of the rows with a hire_date)."""
+        dialect = db.bind.dialect.name
+        # SQLite stores hire_date as text ('YYYY-MM-DD HH:MM:SS+00:00'); keep its date part
+        day_expr = "hire_date" if dialect.startswith("postgresql") else "substr(hire_date, 1, 10)"
+        if since_version is None:
+            where = "hire_date IS NOT NULL AND change_version <= :watermark"
+        else:
+            where = "change_version > :since AND change_version <= :watermark"
+        sql = text(f"""
+            SELECT id, COALESCE(department_id, -1), COALESCE(job_id, -1), {day_expr}
+            FROM employees WHERE {where}
+        """)
+        params = {"since": since_version, "watermark": watermark}
+        result = db.execute(sql, params, execution_options={"stream_results": True})
+
+        parts = {k: [] for k in ("id", "department_id", "job_id", "day")}
+        for chunk in result.partitions(FETCH_SIZE):
+            ids, deps, jobs, days = zip(*chunk)
+            parts["id"].append(np.array(ids, np.int64))
+            parts["department_id"].append(np.array(deps, np.int64))
+            parts["job_id"].append(np.array(jobs, np.int64))
+            parts["day"].append(np.array(days, "datetime64[D]"))
+
+        if not parts["id"]:
+            return np.empty(0, np.int64), self._empty()
+        cols = {k: np.concatenate(v) for k, v in parts.items()}
+        all_ids = cols["id"]
+        dated = ~np.isnat(cols["day"])
+        cols = {k: v[dated] for k, v in cols.items()}
+        days = cols["day"]
+        cols["day"] = days.astype(np.int64)
+        months = days.astype("datetime64[M]").astype(np.int64)
+        cols["year"] = (months // 12 + 1970).astype(np.int32)
+        cols["month"] = (months % 12 + 1).astype(np.int32)
+        return all_ids, cols
+
+    # ----------------------------
+    # Vectorized group-by
+    # ----------------------------
+    def aggregate(self, group_by: List[str], year: Optional[int] = None, include_unknown: bool = True) -> List[Dict[str, object]]:
+        """
+        Counts hires grouped by any combination of GROUP_KEYS.
+        Same semantics as the SQL fallback: missing/unmatched department or job
+        is labelled '(Unknown)'; include_unknown=False drops rows with NULL FKs.
+        """
+        cols = self._cols
+        mask = np.ones(len(cols["id"]), dtype=bool)
+        if year is not None:
+            mask &= cols["year"] == year
+        if not include_unknown:
+            mask &= (cols["department_id"] >= 0) & (cols["job_id"] >= 0)
+
+        codes = np.zeros(int(mask.sum()), dtype=np.int64)
+        labels = []
+        for key in group_by:
+            inverse, key_labels = self._factorize(key, cols, mask)
+            codes = codes * len(key_labels) + inverse
+            labels.append(key_labels)
+
+        total = 1
+        for key_labels in labels:
+            total *= len(key_labels)
+        if total <= DENSE_RANGE:
+            counts = np.bincount(codes, minlength=total)
+            groups = np.flatnonzero(counts)
+            counts = counts[groups]
+        else:
+            groups, counts = np.unique(codes, return_counts=True)
+        rows = []
+        for code, count in zip(groups.tolist(), counts.tolist()):
+            row = {}
+            for key, key_labels in zip(reversed(group_by), reversed(labels)):
+                code, pos = divmod(code, len(key_labels))
+                row[key] = key_labels[pos]
+            rows.append({**{k: row[k] for k in group_by}, "hired": count})
+        return rows
+
+    def _factorize(self, key: str, cols, mask):
+        if key in ("department", "job"):
+            ids = cols["department_id" if key == "department" else "job_id"][mask]
+            names = self.departments if key == "department" else self.jobs
+            uniq, inverse = _factorize_ints(ids)
+            # Group by label (like the SQL): unmatched ids all collapse into '(Unknown)'
+            id_labels = [names.get(i, UNKNOWN) for i in uniq.tolist()]
+            key_labels = sorted(set(id_labels))
+            pos = {label: k for k, label in enumerate(key_labels)}
+            remap = np.array([pos[label] for label in id_labels], dtype=np.int64)
+            return remap[inverse], key_labels
+
+        if key == "quarter":
+            values = (cols["month"][mask] - 1) // 3 + 1
+        else:
+            values = cols[key][mask]
+        uniq, inverse = _factorize_ints(values)
+        return inverse, uniq.tolist()
+
+def _watermarks(db: Session) -> Dict[str, int]:
+    return dict(db.execute(text(
+        "SELECT table_name, version FROM change_counter WHERE table_name IN ('employees', 'departments', 'jobs')"
+    )).all())
+
+def _factorize_ints(values: "np.ndarray"):
+    """(sorted unique values, position of each value in them), without sorting when the range is small."""
+    if not len(values):
+        return values, np.empty(0, np.int64)
+    lo, hi = int(values.min()), int(values.max())
+    if hi - lo >= DENSE_RANGE:
+        uniq, inverse = np.unique(values, return_inverse=True)
+        return uniq, inverse.astype(np.int64)
+    offset = values - lo
+    present = np.bincount(offset, minlength=hi - lo + 1) > 0
+    lookup = np.cumsum(present) - 1
+    return np.flatnonzero(present) + lo, lookup[offset]
+
+# ----------------------------
+# Registry (one snapshot per database: primary, read replica or tenant)
+# ----------------------------
+# Keyed by engine identity plus tenant schema (tenancy.bind_key): Postgres tenants share a URL
+_snapshots: Dict[Tuple[int, Optional[str]], HiringSnapshot] = {}
+_registry_lock = threading.Lock()
+
+def _key(db: Session) -> Tuple[int, Optional[str]]:
+    return bind_key(db.get_bind())
+
+def get_snapshot(db: Session) -> Optional[HiringSnapshot]:
+    """Returns the up-to-date snapshot for this session's database, or None if disabled."""
+    if not snapshot_enabled():
+        return None
+    engine = db.get_bind()
+    key = bind_key(engine)
+    with _registry_lock:
+        snap = _snapshots.get(key)
+        if snap is None:
+            snap = _snapshots[key] = HiringSnapshot()
+            # id() values are reused after collection: never hand this snapshot to another engine
+            weakref.finalize(engine, discard_snapshot, engine=None, key=key)
+    snap.ensure_fresh(db)
+    return snap
+
+def notify_write(db: Session, table: str, mode: str = "insert"):
+    """
+    Called after a committed write so the next query refreshes the snapshot without
+    waiting for the watermark check (which also covers writes made elsewhere).
+    Inserts and upserts stamp a new change_version and are merged incrementally;
+    any other mode (e.g. a table replace) reloads the snapshot in full.
+    Only the snapshot of the written database is marked; snapshots built from read
+    replicas follow through their own watermark once the write has replicated.
+    """
+    with _registry_lock:
+        snap = _snapshots.get(_key(db))
+    if snap is not None:
+        snap.mark_dirty(table, full=(mode not in ("insert", "upsert")))
+
+def discard_snapshot(engine=None, key: Optional[Tuple[int, Optional[str]]] = None):
+    """Drops the snapshot of an engine that was closed (e.g. an evicted tenant)."""
+    with _registry_lock:
+        _snapshots.pop(key if key is not None else bind_key(engine), None)
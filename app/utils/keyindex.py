@@ -0,0 +1,106 @@
+"""
+Key sets used to detect duplicate keys while streaming a file.
+
+- IntIdSet: paged bitmap for integer ids. Each page covers 65,536 consecutive
+  ids in 8 KiB, so a million dense ids take ~128 KiB (a Python set of ints
+  needs ~30-60 MiB). Sparse ids would need a page each: once the pages cost
+  more than a plain set of the same ids, the bitmap is converted to one.
+- TextKeySet: keys of unique text columns (department name, job title) in a
+  plain Python set; it only adds IntIdSet's add() -> bool interface. No
+  memory is saved over a set.
+"""
+import sys
+from typing import Dict, Iterator, Optional, Set
+
+PAGE_SHIFT = 16
+PAGE_MASK = (1 << PAGE_SHIFT) - 1
+PAGE_BYTES = (1 << PAGE_SHIFT) // 8
+# Approximate cost of one int in a Python set (set slot + int object)
+SET_BYTES_PER_KEY = 64
+# Never fall back below this many pages (1 MiB): small bitmaps are cheap either way
+MIN_SPARSE_PAGES = 128
+
+class IntIdSet:
+    __slots__ = ("_pages", "_set", "_len")
+
+    def __init__(self):
+        self._pages: Dict[int, bytearray] = {}
+        self._set: Optional[Set[int]] = None  # replaces the pages once they are too sparse
+        self._len = 0
+
+    def add(self, value: int) -> bool:
+        """Adds value; returns False if it was already present."""
+        if self._set is not None:
+            if value in self._set:
+                return False
+            self._set.add(value)
+            self._len += 1
+            return True
+        page = self._pages.get(value >> PAGE_SHIFT)
+        if page is None:
+            if self._too_sparse():
+                self._set = set(self._iter_pages())
+                self._pages = {}
+                return self.add(value)
+            page = self._pages[value >> PAGE_SHIFT] = bytearray(PAGE_BYTES)
+        off = value & PAGE_MASK
+        bit = 1 << (off & 7)
+        if page[off >> 3] & bit:
+            return False
+        page[off >> 3] |= bit
+        self._len += 1
+        return True
+
+    def _too_sparse(self) -> bool:
+        pages = len(self._pages) + 1
+        return pages > MIN_SPARSE_PAGES and pages * PAGE_BYTES > self._len * SET_BYTES_PER_KEY
+
+    def _iter_pages(self) -> Iterator[int]:
+        for number, page in self._pages.items():
+            base = number << PAGE_SHIFT
+            for pos, byte in enumerate(page):
+                if byte:
+                    for bit in range(8):
+                        if byte & (1 << bit):
+                            yield base + (pos << 3) + bit
+
+    def __contains__(self, value: int) -> bool:
+        if self._set is not None:
+            return value in self._set
+        page = self._pages.get(value >> PAGE_SHIFT)
+        if page is None:
+            return False
+        off = value & PAGE_MASK
+        return bool(page[off >> 3] & (1 << (off & 7)))
+
+    def __len__(self) -> int:
+        return self._len
+
+    @property
+    def nbytes(self) -> int:
+        if self._set is not None:
+            return sys.getsizeof(self._set) + self._len * sys.getsizeof(1 << 32)
+        return len(self._pages) * PAGE_BYTES
+
+class TextKeySet:
+    """A set of text keys whose add() reports whether the key was new (as IntIdSet.add)."""
+    __slots__ = ("_keys",)
+
+    def __init__(self):
+        self._keys = set()
+
+    def add(self, value) -> bool:
+        if value in self._keys:
+            return False
+        self._keys.add(value)
+        return True
+
+    def __contains__(self, value) -> bool:
+        return value in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+def new_key_set(column: str):
+    """IntIdSet for integer id columns, TextKeySet for unique text columns."""
+    return IntIdSet() if column == "id" or column.endswith("_id") else TextKeySet()
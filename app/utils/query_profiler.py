@@ -0,0 +1,232 @@
+"""
+SQL-level query profiler.
+
+Hooks SQLAlchemy engine events to time every statement and aggregate the
+timings by normalized statement fingerprint (literals and bind parameters
+replaced by '?'). Statements slower than profiling.slow_query_ms are logged
+as their fingerprint, with the bound values redacted unless
+profiling.log_parameters is on (they may hold personal data). EXPLAIN can be
+captured on demand for the last sample of any fingerprint; ANALYZE, which
+executes the statement, only for reads. Raw COPY streams, which bypass the
+SQLAlchemy cursor, are recorded through `timed()`.
+"""
+import hashlib
+import logging
+import re
+import reprlib
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from ..config import setting
+
+logger = logging.getLogger("app.sql")
+
+# Durations kept per fingerprint for percentiles (most recent window)
+WINDOW = 1000
+EXPLAINABLE = ("select", "with", "insert", "update", "delete")
+# Statements EXPLAIN ANALYZE may execute: reads only (a WITH may wrap DML)
+_READ_ONLY = re.compile(r"^(?:select|with)\b", re.IGNORECASE)
+_WRITES = re.compile(r"\b(?:insert|update|delete|merge|into)\b", re.IGNORECASE)
+
+# ----------------------------
+# Fingerprinting
+# ----------------------------
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PARAM = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|\$\d+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+_LEADING_COMMENTS = re.compile(r"^\s*(?:--[^\n]*\n\s*)*")
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement: str) -> tuple:
+    """(id, normalized statement). Identical statement shapes share one fingerprint."""
+    norm = _STRING.sub("?", statement)
+    norm = _PARAM.sub("?", norm)
+    norm = _NUMBER.sub("?", norm)
+    norm = _IN_LIST.sub("(?+)", norm)
+    norm = _SPACES.sub(" ", norm).strip().rstrip(";")
+    return hashlib.sha1(norm.encode("utf-8")).hexdigest()[:16], norm
+
+def _percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, int(round(p * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+# Bounded repr: long strings, lists and dicts are cut while formatting, not after
+_repr = reprlib.Repr()
+_repr.maxlevel, _repr.maxstring, _repr.maxother = 3, 120, 120
+_repr.maxlist = _repr.maxtuple = _repr.maxdict = _repr.maxset = 20
+
+def _short(params, limit: int = 500) -> str:
+    text = _repr.repr(params)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+def _redacted(params) -> str:
+    # Shape only: how many values were bound, never the values themselves
+    if not params:
+        return "none"
+    return f"<{len(params)} redacted>" if isinstance(params, (dict, list, tuple)) else "<redacted>"
+
+# ----------------------------
+# Stats
+# ----------------------------
+class StatementStats:
+    __slots__ = ("statement", "count", "total", "max", "rows", "durations", "sample", "dialect")
+
+    def __init__(self, statement: str):
+        self.statement = statement
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.durations = deque(maxlen=WINDOW)
+        self.sample = None  # (raw statement, parameters) of the last execution (first set of an executemany)
+        self.dialect = None
+
+    def as_dict(self, fp: str) -> Dict[str, object]:
+        durations = sorted(self.durations)
+        return {
+            "fingerprint": fp,
+            "statement": self.statement,
+            "count": self.count,
+            "rows": self.rows,
+            "total_ms": round(self.total * 1000, 3),
+            "p50_ms": round(_percentile(durations, 0.50) * 1000, 3),
+            "p95_ms": round(_percentile(durations, 0.95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "dialect": self.dialect,
+        }
+
+class QueryProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, StatementStats] = {}
+        self._engines: Dict[str, Engine] = {}
+        self.installed = False
+
+    # ----- SQLAlchemy event hooks -----
+    def install(self, target=Engine):
+        """Listens on every Engine (default) or on a single engine."""
+        if self.installed:
+            return
+        event.listen(target, "before_cursor_execute", self._before)
+        event.listen(target, "after_cursor_execute", self._after)
+        event.listen(target, "handle_error", self._error)
+        self.installed = True
+
+    def uninstall(self, target=Engine):
+        if not self.installed:
+            return
+        event.remove(target, "before_cursor_execute", self._before)
+        event.remove(target, "after_cursor_execute", self._after)
+        event.remove(target, "handle_error", self._error)
+        self.installed = False
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        if statement.lstrip()[:7].upper() == "EXPLAIN":
+            return
+        rows = cursor.rowcount if cursor.rowcount and cursor.rowcount > 0 else 0
+        if executemany:  # keep one parameter set, not the whole batch
+            parameters = parameters[0] if parameters else None
+        self.record(statement, elapsed, rows, parameters, conn.engine)
+
+    def _error(self, context):
+        # A failed statement never reaches _after: drop its start time
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts and context.statement is not None:
+            starts.pop()
+
+    # ----- Recording -----
+    def record(self, statement: str, elapsed: float, rows: int = 0, parameters=None, engine: Optional[Engine] = None):
+        fp, norm = fingerprint(statement)
+        with self._lock:
+            stats = self._stats.get(fp)
+            if stats is None:
+                stats = self._stats[fp] = StatementStats(norm)
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.rows += rows
+            stats.durations.append(elapsed)
+            stats.sample = (statement, parameters)
+            if engine is not None:
+                stats.dialect = engine.dialect.name
+                self._engines[fp] = engine
+
+        threshold_ms = setting("profiling", "slow_query_ms", 500)
+        if threshold_ms is not None and elapsed * 1000 >= threshold_ms:
+            # The fingerprint has literals replaced by '?'; bound values stay out of the log by default
+            shown = _short(parameters) if setting("profiling", "log_parameters", False) else _redacted(parameters)
+            logger.warning("Slow query (%.1f ms, %d rows) [%s]: %s | params=%s", elapsed * 1000, rows, fp, norm, shown)
+
+    @contextmanager
+    def timed(self, statement: str, engine: Optional[Engine] = None):
+        """Times a block that runs SQL outside the SQLAlchemy cursor (e.g. COPY streams); no-op unless installed."""
+        counter = {"rows": 0}
+        start = time.perf_counter()
+        try:
+            yield counter
+        finally:
+            if self.installed:
+                self.record(statement, time.perf_counter() - start, counter["rows"], engine=engine)
+
+    # ----- Reporting -----
+    def report(self, order_by: str = "total_ms", limit: int = 50) -> List[Dict[str, object]]:
+        with self._lock:
+            rows = [s.as_dict(fp) for fp, s in self._stats.items()]
+        rows.sort(key=lambda r: r[order_by], reverse=True)
+        return rows[:limit]
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._engines.clear()
+
+    def explain(self, fp: str, analyze: bool = False) -> Dict[str, object]:
+        """
+        Runs EXPLAIN for the last sample of a fingerprint on the engine that executed it.
+        Postgres: EXPLAIN (ANALYZE, BUFFERS) when analyze=True, inside a rolled back transaction;
+                  SELECT (or read-only WITH) fingerprints only, ANALYZE executes the statement.
+        SQLite:   EXPLAIN QUERY PLAN.
+        """
+        with self._lock:
+            stats = self._stats.get(fp)
+            engine = self._engines.get(fp)
+        if stats is None or stats.sample is None or engine is None:
+            raise KeyError(fp)
+
+        statement, parameters = stats.sample
+        body = _LEADING_COMMENTS.sub("", statement)
+        if not body.lower().startswith(EXPLAINABLE):
+            raise ValueError("EXPLAIN is only available for SELECT/WITH/INSERT/UPDATE/DELETE statements.")
+        if analyze and not (_READ_ONLY.match(body) and not _WRITES.search(stats.statement)):
+            raise ValueError("EXPLAIN ANALYZE executes the statement: only available for SELECT statements.")
+
+        if engine.dialect.name.startswith("postgresql"):
+            prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+        else:
+            prefix = "EXPLAIN QUERY PLAN "
+
+        with engine.connect() as conn:
+            trans = conn.begin()
+            try:
+                result = conn.exec_driver_sql(prefix + statement, parameters or ())
+                plan = [" | ".join(str(v) for v in row) for row in result]
+            finally:
+                trans.rollback()
+        return {**stats.as_dict(fp), "analyze": analyze and engine.dialect.name.startswith("postgresql"), "plan": plan}
+
+query_profiler = QueryProfiler()
@@ -0,0 +1,272 @@
+"""
+Opt-in per-request profiling.
+
+A sampling profiler (a background thread reading sys._current_frames())
+records the stacks of the threads working for a flagged request: the event
+loop while the request's task is the one running, and the threadpool
+workers whose job was started from the request (sync endpoints, ingestion),
+recognized by the context they run in. Concurrent requests do not leak
+into the profile. Profiles are saved as speedscope JSON
+(https://www.speedscope.app) in a bounded directory that evicts the oldest
+files. The ASGI middleware only touches requests that carry the flag and a
+valid admin token; all other requests go straight to the app.
+"""
+import asyncio
+import contextvars
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+
+from ..config import setting
+from ..security import is_admin_token
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_ID_HEADER = b"x-profile-id"
+ADMIN_HEADER = b"x-admin-token"
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Innermost frames of threads that are blocked/idle rather than working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("_worker.py", "run"),  # anyio worker thread waiting for jobs
+}
+
+# Profiler of the request being served; copied into the context of its threadpool jobs
+_active_profiler: "contextvars.ContextVar[Optional[SamplingProfiler]]" = contextvars.ContextVar("active_profiler", default=None)
+
+def _worker_run_code():
+    # Frame that runs a threadpool job: its `context` local is the job's copy of the request context
+    try:
+        from anyio._backends._asyncio import WorkerThread
+        return WorkerThread.run.__code__
+    except (ImportError, AttributeError):
+        return None
+
+_WORKER_RUN = _worker_run_code()
+
+# ----------------------------
+# Sampling profiler
+# ----------------------------
+class SamplingProfiler:
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop_thread: Optional[int] = None
+        self.frames: List[Dict[str, object]] = []
+        self._frame_index: Dict[Tuple[str, str, int], int] = {}
+        self.samples: Dict[int, List[Tuple[List[int], float]]] = {}
+        self.thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.started = self.stopped = 0.0
+
+    def attach(self) -> contextvars.Token:
+        """Restricts sampling to the calling task and its threadpool jobs (call from the request's task)."""
+        self._loop, self._task = asyncio.get_running_loop(), asyncio.current_task()
+        self._loop_thread = threading.get_ident()
+        return _active_profiler.set(self)
+
+    def _owns(self, tid: int, frame) -> bool:
+        if self._task is None:
+            return True
+        if tid == self._loop_thread:
+            return asyncio.current_task(self._loop) is self._task
+        if _WORKER_RUN is None:  # unknown threadpool implementation: keep every busy worker
+            return True
+        while frame is not None:
+            if frame.f_code is _WORKER_RUN:
+                context = frame.f_locals.get("context")
+                return isinstance(context, contextvars.Context) and context.get(_active_profiler) is self
+            frame = frame.f_back
+        return False
+
+    def start(self):
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped = time.perf_counter()
+
+    def _frame_id(self, code) -> int:
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        idx = self._frame_index.get(key)
+        if idx is None:
+            idx = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return idx
+
+    def _run(self):
+        me = threading.get_ident()
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = now - last, now
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES or not self._owns(tid, frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_id(frame.f_code))
+                    frame = frame.f_back
+                stack.reverse()
+                self.samples.setdefault(tid, []).append((stack, weight))
+
+    def to_speedscope(self, name: str) -> Dict[str, object]:
+        names = {t.ident: t.name for t in threading.enumerate()}
+        duration = self.stopped - self.started
+        profiles = []
+        # A request faster than one interval has no samples: keep one (empty) profile for viewers
+        for tid, samples in (self.samples or {self._loop_thread or threading.get_ident(): []}).items():
+            profiles.append({
+                "type": "sampled",
+                "name": f"{name} [{names.get(tid, tid)}]",
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": duration,
+                "samples": [s for s, _ in samples],
+                "weights": [w for _, w in samples],
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "db_migration_api",
+            "activeProfileIndex": 0,
+            "shared": {"frames": self.frames},
+            "profiles": profiles,
+        }
+
+# ----------------------------
+# Bounded profile store
+# ----------------------------
+class ProfileStore:
+    """Directory of speedscope files capped by count and total size; oldest files are evicted first."""
+    SUFFIX = ".speedscope.json"
+
+    def __init__(self, directory: str, max_files: int = 50, max_bytes: int = 200 * 1024 * 1024):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def _path(self, profile_id: str) -> str:
+        return os.path.join(self.directory, profile_id + self.SUFFIX)
+
+    def save(self, profile_id: str, profile: Dict[str, object]):
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(profile_id) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(profile, f, separators=(",", ":"))
+        os.replace(tmp, self._path(profile_id))
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.directory):
+                if name.endswith(self.SUFFIX):
+                    st = os.stat(os.path.join(self.directory, name))
+                    entries.append((st.st_mtime, st.st_size, name))
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_files or total > self.max_bytes):
+                _, size, name = entries.pop(0)
+                total -= size
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+
+    def path(self, profile_id: str) -> Optional[str]:
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        path = self._path(profile_id)
+        return path if os.path.isfile(path) else None
+
+    def list(self) -> List[Dict[str, object]]:
+        if not os.path.isdir(self.directory):
+            return []
+        out = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                st = os.stat(os.path.join(self.directory, name))
+                out.append({"id": name[: -len(self.SUFFIX)], "bytes": st.st_size, "created": st.st_mtime})
+        return sorted(out, key=lambda p: p["created"], reverse=True)
+
+profile_store = ProfileStore(
+    setting("profiling", "profile_dir") or os.path.join(tempfile.gettempdir(), "db_migration_api_profiles"),
+    max_files=int(setting("profiling", "max_profiles", 50)),
+    max_bytes=int(setting("profiling", "max_profile_mb", 200)) * 1024 * 1024,
+)
+
+# ----------------------------
+# ASGI middleware
+# ----------------------------
+def _wants_profile(scope) -> bool:
+    flagged = False
+    token = None
+    for name, value in scope["headers"]:
+        if name == PROFILE_HEADER:
+            flagged = value not in (b"", b"0", b"false")
+        elif name == ADMIN_HEADER:
+            token = value.decode("latin-1")
+    qs = scope.get("query_string", b"")
+    if not flagged and b"profile=" in qs:
+        flagged = parse_qs(qs.decode("latin-1")).get("profile", ["0"])[-1] not in ("", "0", "false")
+    return flagged and is_admin_token(token)
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when it carries `X-Profile: 1` (or `?profile=1`) together
+    with a valid X-Admin-Token. The response gets an X-Profile-Id header;
+    the profile is served by GET /admin/profiles/{id}.
+    """
+    def __init__(self, app, store: ProfileStore = profile_store, interval_ms: float = 1.0):
+        self.app = app
+        self.store = store
+        self.interval = interval_ms / 1000
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _wants_profile(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(PROFILE_ID_HEADER, profile_id.encode("latin-1"))]
+            await send(message)
+
+        profiler = SamplingProfiler(self.interval)
+        token = profiler.attach()
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profiler.stop()
+            _active_profiler.reset(token)
+            # Serializing and writing the profile is blocking file I/O: keep it off the event loop
+            await run_in_threadpool(self._save, profile_id, profiler, f"{scope['method']} {scope['path']}")
+
+    def _save(self, profile_id: str, profiler: SamplingProfiler, name: str):
+        self.store.save(profile_id, profiler.to_speedscope(name))
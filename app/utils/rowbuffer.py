@@ -0,0 +1,151 @@
+"""
+Bounded-memory buffer of coerced rows.
+
+ingest_csv parses and validates the whole file before the write transaction
+starts (all-or-nothing, duplicate resolution), so the rows have to be kept
+somewhere. RowBuffer keeps them in memory up to a byte budget and then
+spills every row to an anonymous temp file as compact binary records:
+a fixed-width struct per table followed by the UTF-8 text column.
+Rows are streamed back in insertion order, so the writers never hold more
+than one batch at a time.
+"""
+import struct
+import tempfile
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .types import TableName
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICRO = timedelta(microseconds=1)
+_WRITE_CHUNK = 1024 * 1024
+# Approximate size in memory of one buffered row (dict + boxed values), without its text
+_ROW_OVERHEAD = {"departments": 360, "jobs": 360, "employees": 640}
+
+# ----------------------------
+# Record codecs
+# ----------------------------
+class _LabelCodec:
+    """departments / jobs: row number, id, text length | text"""
+    def __init__(self, label: str):
+        self.label = label
+        self.head = struct.Struct("<IqI")
+
+    def pack(self, idx: int, row: Dict[str, object]) -> bytes:
+        text = row[self.label].encode("utf-8")
+        return self.head.pack(idx, row["id"], len(text)) + text
+
+    def unpack(self, head: tuple, text: bytes) -> Tuple[int, Dict[str, object]]:
+        idx, id_, _ = head
+        return idx, {"id": id_, self.label: text.decode("utf-8")}
+
+class _EmployeeCodec:
+    """employees: row number, id, department_id, job_id, hire_date (UTC µs + offset s), name length | name"""
+    head = struct.Struct("<IqqqqiI")
+
+    def pack(self, idx: int, row: Dict[str, object]) -> bytes:
+        hd = row["hire_date"]
+        offset = hd.utcoffset()
+        text = row["name"].encode("utf-8")
+        return self.head.pack(
+            idx, row["id"], row["department_id"], row["job_id"],
+            (hd - _EPOCH) // _MICRO, int(offset.total_seconds()), len(text),
+        ) + text
+
+    def unpack(self, head: tuple, text: bytes) -> Tuple[int, Dict[str, object]]:
+        idx, id_, dep, job, micros, offset, _ = head
+        tz = timezone.utc if offset == 0 else timezone(timedelta(seconds=offset))
+        hire_date = (_EPOCH + micros * _MICRO).astimezone(tz)
+        return idx, {"id": id_, "name": text.decode("utf-8"), "department_id": dep, "job_id": job, "hire_date": hire_date}
+
+def _codec(table: TableName):
+    if table == "employees":
+        return _EmployeeCodec()
+    return _LabelCodec("name" if table == "departments" else "title")
+
+# ----------------------------
+# Buffer
+# ----------------------------
+class RowBuffer:
+    """
+    Append-only (row number, row) buffer. Use as a context manager so the spill
+    file is always removed; iterate it (any number of times) to read the rows back.
+    """
+    def __init__(self, table: TableName, budget_bytes: int, spill_dir: Optional[str] = None):
+        self.table = table
+        self.budget = budget_bytes
+        self.spill_dir = spill_dir or None
+        self._rows: List[Tuple[int, Dict[str, object]]] = []
+        self._mem_bytes = 0
+        self._overhead = _ROW_OVERHEAD[table]
+        self._codec = _codec(table)
+        self._file = None
+        self._pending: List[bytes] = []
+        self._pending_bytes = 0
+        self.spilled_bytes = 0
+        self.count = 0
+
+    def __enter__(self) -> "RowBuffer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self._rows = []
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def append(self, idx: int, row: Dict[str, object]):
+        self.count += 1
+        if self._file is None:
+            self._rows.append((idx, row))
+            self._mem_bytes += self._overhead + len(row.get("name") or row.get("title") or "")
+            if self._mem_bytes > self.budget:
+                self._spill()
+            return
+        self._write(self._codec.pack(idx, row))
+
+    def _spill(self):
+        self._file = tempfile.TemporaryFile(dir=self.spill_dir)
+        for idx, row in self._rows:
+            self._write(self._codec.pack(idx, row))
+        self._rows = []
+        self._mem_bytes = 0
+
+    def _write(self, record: bytes):
+        self._pending.append(record)
+        self._pending_bytes += len(record)
+        if self._pending_bytes >= _WRITE_CHUNK:
+            self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._file.write(b"".join(self._pending))
+            self.spilled_bytes += self._pending_bytes
+            self._pending, self._pending_bytes = [], 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Tuple[int, Dict[str, object]]]:
+        if self._file is None:
+            yield from self._rows
+            return
+
+        self._flush()
+        f = self._file
+        f.seek(0)
+        head = self._codec.head
+        unpack = self._codec.unpack
+        while True:
+            raw = f.read(head.size)
+            if not raw:
+                break
+            fields = head.unpack(raw)
+            yield unpack(fields, f.read(fields[-1]))
@@ -0,0 +1,100 @@
+"""
+Fast ISO-8601 timestamp parsing for a CSV column.
+
+validators.parse_date is correct but slow in a loop: strip, 'Z' rewriting,
+fromisoformat, a strptime fallback and a datetime.now() call per value
+(now() alone costs more than parsing). TimestampParser keeps parse_date's
+rules and error messages, but:
+- detects the column's layout from its first value and picks a specialized
+  fast path for it (C fromisoformat on the raw value when the interpreter
+  accepts the layout as is, 'Z' rewriting only where it does not);
+- caches date-only values by their 'YYYY-MM-DD' text (hire dates repeat a lot);
+- compares against one "now" snapshot per batch of values;
+- only tries the full parse_iso_datetime fallback chain on fast-path misses,
+  and re-detects the layout when the misses keep coming (mixed formats).
+"""
+from datetime import datetime, timezone
+from typing import Callable, Dict, Optional
+
+from .validators import parse_iso_datetime
+
+UTC = timezone.utc
+# Consecutive fast-path misses before the layout is detected again
+REDETECT_AFTER = 32
+DATE_CACHE_SIZE = 8192
+
+_fromiso = datetime.fromisoformat
+
+def _iso(txt: str) -> datetime:
+    # Offsets, 'Z' (Python 3.11+), fractions; naive values are UTC
+    dt = _fromiso(txt)
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=UTC)
+
+def _iso_z(txt: str) -> datetime:
+    # 'Z' suffix on interpreters whose fromisoformat does not accept it
+    if txt[-1:] != "Z":
+        raise ValueError(txt)
+    return _fromiso(txt[:-1] + "+00:00")
+
+class TimestampParser:
+    """One instance per column per ingest; not thread safe."""
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self._fast: Optional[Callable[[str], datetime]] = None
+        self._days: Dict[str, datetime] = {}
+        self._misses = 0
+        self._until_refresh = 0
+        self.now = datetime.now(UTC)
+        self.fast_hits = 0
+        self.fallbacks = 0
+
+    def parse(self, s: str) -> datetime:
+        """Same contract as validators.parse_date: aware datetime, ValueError if invalid or in the future."""
+        if self._until_refresh <= 0:
+            self.now = datetime.now(UTC)
+            self._until_refresh = self.batch_size
+        self._until_refresh -= 1
+
+        txt = s.strip() if s else ""
+        if self._fast is None or self._misses >= REDETECT_AFTER:
+            self._fast = self._detect(txt)
+            self._misses = 0
+        try:
+            if self._fast is None:
+                raise ValueError(txt)
+            dt = self._fast(txt)
+            self._misses = 0
+            self.fast_hits += 1
+        except ValueError:
+            # Full rule chain (and its error messages) only for values the fast path rejects
+            self._misses += 1
+            self.fallbacks += 1
+            dt = parse_iso_datetime(s)
+
+        if dt > self.now:
+            raise ValueError(f"Future hire_date is not allowed: {dt.isoformat()}")
+        return dt
+
+    __call__ = parse
+
+    def _detect(self, txt: str) -> Optional[Callable[[str], datetime]]:
+        for fast in (self._day, _iso, _iso_z):
+            try:
+                fast(txt)
+                return fast
+            except ValueError:
+                continue
+        return None
+
+    def _day(self, txt: str) -> datetime:
+        # 'YYYY-MM-DD' -> midnight UTC, cached per distinct day
+        dt = self._days.get(txt)
+        if dt is None:
+            if len(txt) != 10:
+                raise ValueError(txt)
+            dt = _fromiso(txt).replace(tzinfo=UTC)
+            if len(self._days) >= DATE_CACHE_SIZE:
+                self._days.clear()
+            self._days[txt] = dt
+        return dt
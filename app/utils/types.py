@@ -16,3 +16,16 @@ EXPECTED_HEADERS = {
     ],
 }
 
+# Columns that must be unique per table (PK + unique constraints in app/models.py)
+UNIQUE_COLUMNS = {
+    "departments": ["id", "name"],
+    "jobs": ["id", "title"],
+    "employees": ["id"],
+}
+
+# FK columns -> referenced table
+FOREIGN_KEYS = {
+    "departments": {},
+    "jobs": {},
+    "employees": {"department_id": "departments", "job_id": "jobs"},
+}
@@ -1,10 +1,10 @@
 from datetime import datetime, date, timezone
 from decimal import Decimal, InvalidOperation
 
-def parse_date(s: str) -> datetime:
+def parse_iso_datetime(s: str) -> datetime:
     """
     Accepts ISO 8601: 'YYYY-MM-DDTHH:MM:SSZ' or with offset '+00:00'.
-    Validates that the date is not in the future.
+    Naive values are taken as UTC. No future-date check (see parse_date).
     """
     if not s or not s.strip():
         raise ValueError("Empty or null datetime.")
@@ -29,7 +29,15 @@ def parse_date(s: str) -> datetime:
 
     if dt.tzinfo is None:
         dt = dt.replace(tzinfo=timezone.utc)
+    return dt
 
+def parse_date(s: str) -> datetime:
+    """
+    Accepts ISO 8601: 'YYYY-MM-DDTHH:MM:SSZ' or with offset '+00:00'.
+    Validates that the date is not in the future.
+    For bulk parsing use app/utils/timestamps.TimestampParser (same rules, much faster).
+    """
+    dt = parse_iso_datetime(s)
     if dt > datetime.now(tz=timezone.utc):
         raise ValueError(f"Future hire_date is not allowed: {dt.isoformat()}")
 
@@ -0,0 +1,15 @@
+"""
+Gunicorn settings for the production image.
+
+The app is imported once in the master (preload_app) and shared copy-on-write
+by the workers, so config parsing and module imports are paid once per
+container instead of once per worker. This is safe because the DB engine is
+created lazily and its pool is reset in every forked child (see app/db.py).
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+timeout = 120
+preload_app = True
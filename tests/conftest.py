@@ -2,7 +2,7 @@ import os
 import pytest
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from app.db import Base, get_db
+from app.db import Base, get_db, get_read_db
 from app.main import app
 
 # Force the use of SQLite for testing
@@ -30,3 +30,20 @@ def override_get_db():
         finally:
             db.close()
     app.dependency_overrides[get_db] = _get_test_db
+    app.dependency_overrides[get_read_db] = _get_test_db
+
+# Postgres for the Postgres-only tests: TEST_POSTGRES_URL, else a throwaway server from
+# the pgserver package (requirements.txt), else those tests are skipped
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    url = os.getenv("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+    pgserver = pytest.importorskip("pgserver", reason="TEST_POSTGRES_URL is not set and pgserver is not installed")
+    data_dir = tmp_path_factory.mktemp("pgdata")
+    server = pgserver.get_server(str(data_dir), cleanup_mode="stop")
+    try:
+        yield server.get_uri().replace("postgresql://", "postgresql+psycopg://", 1)
+    finally:
+        server.cleanup()
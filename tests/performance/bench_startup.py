@@ -0,0 +1,66 @@
+"""
+Cold start benchmark: time from process spawn to the first healthy GET /health.
+
+Usage (from the repo root):
+    python tests/performance/bench_startup.py --runs 5
+    python tests/performance/bench_startup.py --runs 5 --gunicorn --workers 2
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def time_to_healthy(cmd, port: int, timeout: float = 60.0) -> float:
+    env = {**os.environ, "TESTING": "1", "PORT": str(port)}
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as r:
+                    if r.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.01)
+        raise TimeoutError("server did not become healthy")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--gunicorn", action="store_true", help="use gunicorn.conf.py (preload) instead of a single uvicorn process")
+    parser.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    results = []
+    for _ in range(args.runs):
+        port = free_port()
+        if args.gunicorn:
+            cmd = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--workers", str(args.workers),
+                   "--bind", f"127.0.0.1:{port}", "app.main:app"]
+        else:
+            cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)]
+        results.append(time_to_healthy(cmd, port))
+
+    print(f"time to first healthy /health over {args.runs} runs: "
+          f"median {statistics.median(results) * 1000:.0f} ms, min {min(results) * 1000:.0f} ms, max {max(results) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
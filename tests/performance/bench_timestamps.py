@@ -0,0 +1,65 @@
+"""
+Micro-benchmark: validators.parse_date vs timestamps.TimestampParser on a
+hire_date-like column (few distinct days, many rows).
+
+Usage (from the repo root):
+    python tests/performance/bench_timestamps.py --rows 200000
+    python tests/performance/bench_timestamps.py --rows 200000 --layout offset
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+sys.path.insert(0, ROOT)
+
+from app.utils.timestamps import TimestampParser  # noqa: E402
+from app.utils.validators import parse_date  # noqa: E402
+
+LAYOUTS = {
+    "z": "{d}T{t}Z",
+    "offset": "{d}T{t}-03:00",
+    "naive": "{d} {t}",
+    "day": "{d}",
+}
+
+
+def make_values(rows: int, layout: str, seed: int = 7):
+    rnd = random.Random(seed)
+    fmt = LAYOUTS[layout]
+    values = []
+    for _ in range(rows):
+        d = f"{rnd.randint(2015, 2022)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}"
+        t = f"{rnd.randint(0, 23):02d}:{rnd.randint(0, 59):02d}:{rnd.randint(0, 59):02d}"
+        values.append(fmt.format(d=d, t=t))
+    return values
+
+
+def bench(fn, values) -> float:
+    start = time.perf_counter()
+    for v in values:
+        fn(v)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="z")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    values = make_values(args.rows, args.layout)
+    legacy = min(bench(parse_date, values) for _ in range(args.repeat))
+    fast = min(bench(TimestampParser().parse, values) for _ in range(args.repeat))
+
+    print(f"rows={args.rows} layout={args.layout}")
+    print(f"parse_date       {args.rows / legacy:>12,.0f} values/s")
+    print(f"TimestampParser  {args.rows / fast:>12,.0f} values/s")
+    print(f"speedup          {legacy / fast:>12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
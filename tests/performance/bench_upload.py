@@ -0,0 +1,84 @@
+"""
+Rows/sec benchmark: legacy per-table /upload path vs the streaming ingestion engine.
+
+Usage (from the repo root):
+    python tests/performance/bench_upload.py --rows 100000
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import Employee
+from app.utils.csv_ingest import ingest_csv
+
+
+def make_csv(rows: int) -> str:
+    out = io.StringIO()
+    w = csv.writer(out)
+    w.writerow(["id", "name", "hire_date", "department_id", "job_id"])
+    start = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    for i in range(1, rows + 1):
+        hd = (start + timedelta(minutes=i)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        w.writerow([i, f"Employee {i}", hd, i % 12 + 1, i % 183 + 1])
+    return out.getvalue()
+
+
+def legacy_upload(db, content: str) -> int:
+    # Verbatim logic of the former /employees/upload endpoint
+    reader = csv.DictReader(io.StringIO(content))
+    payload = []
+    for row in reader:
+        if "hire_date" in row and row["hire_date"]:
+            row["hire_date"] = datetime.fromisoformat(row["hire_date"].replace("Z", "")).date()
+        for key in ["job_id", "department_id"]:
+            if row.get(key) == "":
+                row[key] = None
+        payload.append(row)
+    with db.begin():
+        db.bulk_insert_mappings(Employee, payload)
+    return len(payload)
+
+
+def engine_upload(db, content: str) -> int:
+    return ingest_csv(db, "employees", io.StringIO(content))["inserted"]
+
+
+def run(label: str, fn, content: str) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        db = sessionmaker(bind=engine)()
+        t0 = time.perf_counter()
+        n = fn(db, content)
+        elapsed = time.perf_counter() - t0
+        db.close()
+        engine.dispose()
+    rate = n / elapsed
+    print(f"{label:<8} {n:>9} rows  {elapsed:8.3f}s  {rate:>12,.0f} rows/s")
+    return rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=50_000)
+    args = parser.parse_args()
+
+    content = make_csv(args.rows)
+    old = run("legacy", legacy_upload, content)
+    new = run("engine", engine_upload, content)
+    print(f"speedup  {new / old:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
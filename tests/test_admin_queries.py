@@ -0,0 +1,105 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from app.main import app
+from app.utils import query_profiler as query_profiler_module
+from app.utils.query_profiler import QueryProfiler, _short, query_profiler
+
+client = TestClient(app)
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+
+def test_admin_requires_token(monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    assert client.get("/admin/queries").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    assert client.get("/admin/queries", headers={"X-Admin-Token": "wrong"}).status_code == 401
+
+@pytest.fixture
+def profiling():
+    # Off by default (profiling.sql): install on every engine for the test only
+    installed = query_profiler.installed
+    query_profiler.install()
+    yield
+    if not installed:
+        query_profiler.uninstall()
+
+def test_query_stats_and_explain(monkeypatch, profiling):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    assert client.delete("/admin/queries", headers=ADMIN).status_code == 200
+
+    for year in (2020, 2021):
+        assert client.get("/metrics/departments_above_mean", params={"year": year}).status_code == 200
+
+    response = client.get("/admin/queries", headers=ADMIN)
+    assert response.status_code == 200
+    queries = response.json()["queries"]
+    # Both years share one fingerprint: literals and bind parameters are normalized
+    hires = [q for q in queries if "WITH hires AS" in q["statement"]]
+    assert len(hires) == 1
+    assert hires[0]["count"] == 2
+    assert hires[0]["max_ms"] >= hires[0]["p50_ms"]
+
+    explain = client.get(f"/admin/queries/{hires[0]['fingerprint']}/explain", headers=ADMIN)
+    assert explain.status_code == 200, explain.text
+    assert explain.json()["plan"]
+
+    assert client.get("/admin/queries/unknown/explain", headers=ADMIN).status_code == 404
+
+def test_profiler_keeps_one_parameter_set_and_survives_errors():
+    engine = create_engine("sqlite://")
+    profiler = QueryProfiler()
+    profiler.install(engine)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, v TEXT)"))
+            conn.execute(text("INSERT INTO t (id, v) VALUES (:id, :v)"), [{"id": i, "v": "x"} for i in range(1000)])
+            with pytest.raises(IntegrityError):
+                conn.execute(text("INSERT INTO t (id, v) VALUES (1, 'dup')"))
+            assert conn.info["query_start"] == []
+
+        inserts = [s for s in profiler._stats.values() if s.statement.startswith("INSERT") and s.count]
+        assert [s.sample[1] for s in inserts] == [(0, "x")]
+    finally:
+        profiler.uninstall(engine)
+        engine.dispose()
+
+def test_logged_parameters_are_truncated_while_formatting():
+    logged = _short({"ids": list(range(100_000)), "name": "x" * 10_000})
+    assert len(logged) <= 503 and "..." in logged
+
+def _sqlite_profiler():
+    engine = create_engine("sqlite://")
+    profiler = QueryProfiler()
+    profiler.install(engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER PRIMARY KEY, email TEXT)"))
+        conn.execute(text("INSERT INTO t (id, email) VALUES (:id, :email)"), {"id": 1, "email": "jane@example.com"})
+        conn.execute(text("SELECT id FROM t WHERE email = 'jane@example.com'"))
+    return engine, profiler
+
+def test_slow_query_log_redacts_values(monkeypatch, caplog):
+    monkeypatch.setattr(query_profiler_module, "setting",
+                        lambda section, key, default=None: 0 if key == "slow_query_ms" else default)
+    with caplog.at_level("WARNING", logger="app.sql"):
+        engine, profiler = _sqlite_profiler()
+    profiler.uninstall(engine)
+    engine.dispose()
+
+    logged = "\n".join(r.getMessage() for r in caplog.records)
+    assert "Slow query" in logged and "params=<2 redacted>" in logged
+    assert "jane@example.com" not in logged  # neither bound nor inlined
+
+def test_explain_analyze_only_runs_selects():
+    engine, profiler = _sqlite_profiler()
+    try:
+        fps = {s.statement.split()[0]: fp for fp, s in profiler._stats.items()}
+        with pytest.raises(ValueError, match="only available for SELECT"):
+            profiler.explain(fps["INSERT"], analyze=True)
+        assert profiler.explain(fps["INSERT"])["analyze"] is False
+        assert profiler.explain(fps["SELECT"], analyze=True)["plan"]
+    finally:
+        profiler.uninstall(engine)
+        engine.dispose()
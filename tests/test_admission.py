@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.admission import AdmissionController, admission
+
+client = TestClient(app)
+
+def test_queue_full_is_rejected_with_retry_after():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=1, per_table=1, max_queue=0)
+        async with ctl.admit("jobs"):
+            with pytest.raises(HTTPException) as exc:
+                async with ctl.admit("employees"):
+                    pass
+        return exc.value
+
+    err = asyncio.run(scenario())
+    assert err.status_code == 429
+    assert int(err.headers["Retry-After"]) >= 1
+
+def test_waiters_are_admitted_when_a_slot_frees():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=4, per_table=1, max_queue=4)
+        order = []
+
+        async def ingest(name):
+            async with ctl.admit("employees"):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(ingest("a"), ingest("b"), ingest("c"))
+        return ctl, order
+
+    ctl, order = asyncio.run(scenario())
+    assert sorted(order) == ["a", "b", "c"]
+    assert ctl.active == 0 and ctl.waiting == 0
+
+def test_byte_budget_limits_concurrent_uploads():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=4, per_table=4, max_bytes=100, max_queue=0)
+        async with ctl.admit("jobs", 80):
+            with pytest.raises(HTTPException):
+                async with ctl.admit("departments", 40):
+                    pass
+            async with ctl.admit("departments", 20):
+                return ctl.bytes_in_flight
+
+    assert asyncio.run(scenario()) == 100
+
+def test_upload_returns_429_when_at_capacity(monkeypatch):
+    monkeypatch.setattr(admission, "active", admission.max_concurrent)
+    monkeypatch.setattr(admission, "max_queue", 0)
+
+    files = {"file": ("jobs.csv", b"id,title\n9901,Capacity Tester\n", "text/csv")}
+    response = client.post("/jobs/upload", files=files)
+
+    assert response.status_code == 429
+    assert "retry-after" in response.headers
+
+def test_one_tenant_cannot_starve_another():
+    async def scenario():
+        ctl = AdmissionController(max_concurrent=4, per_table=2, per_tenant=2, max_queue=0)
+        async with ctl.admit("employees", tenant="acme"), ctl.admit("employees", tenant="acme"):
+            # acme is at its table and tenant limits, globex still gets a slot
+            with pytest.raises(HTTPException):
+                async with ctl.admit("jobs", tenant="acme"):
+                    pass
+            async with ctl.admit("employees", tenant="globex"):
+                return ctl.status()
+
+    status = asyncio.run(scenario())
+    assert status["active_by_table"] == {"acme/employees": 2, "globex/employees": 1}
+    assert status["active_by_tenant"] == {"acme": 2, "globex": 1}
@@ -0,0 +1,121 @@
+import json
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from app.db import Base, get_db
+from app.main import app
+from app.models import Department
+from app.utils.changes import ChangeCounterBusy, current_watermark, next_change_version
+from app.utils.group_commit import GroupCommitter
+from app.utils.csv_ingest import ingest_csv, ingest_rows
+
+client = TestClient(app)
+
+def _changes(table: str, since: int):
+    response = client.get(f"/changes/{table}", params={"since": since})
+    assert response.status_code == 200, response.text
+    rows = [json.loads(line) for line in response.text.splitlines() if line]
+    return int(response.headers["X-Watermark"]), rows
+
+def _upload(content: str):
+    files = {"file": ("departments.csv", content.encode("utf-8"), "text/csv")}
+    return client.post("/ingest/csv", data={"table": "departments"}, files=files)
+
+def test_changes_returns_only_rows_after_watermark():
+    start, _ = _changes("departments", 0)
+
+    assert _upload("id,name\n9701,Feed A\n9702,Feed B\n").status_code == 200
+    first, rows = _changes("departments", start)
+    assert first > start
+    assert [r["id"] for r in rows] == [9701, 9702]
+    assert {r["change_version"] for r in rows} == {first}
+
+    response = client.post("/departments/batch", json=[{"id": 9703, "name": "Feed C"}])
+    assert response.status_code == 200, response.text
+    second, rows = _changes("departments", first)
+    assert second > first
+    assert [(r["id"], r["name"]) for r in rows] == [(9703, "Feed C")]
+
+def test_changes_past_watermark_is_empty():
+    watermark, _ = _changes("jobs", 0)
+    again, rows = _changes("jobs", watermark)
+    assert again == watermark
+    assert rows == []
+
+def test_upserted_rows_reappear_with_new_version():
+    assert _upload("id,name\n9711,Feed Upsert\n").status_code == 200
+    watermark, _ = _changes("departments", 0)
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        ingest_csv(db, "departments", "id,name\n9711,Feed Upserted\n", mode="upsert")
+    finally:
+        db.close()
+
+    latest, rows = _changes("departments", watermark)
+    assert latest == watermark + 1
+    assert [(r["id"], r["name"], r["change_version"]) for r in rows] == [(9711, "Feed Upserted", latest)]
+
+def test_bulk_load_writes_each_row_once_with_its_version():
+    db = next(app.dependency_overrides[get_db]())
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        before = current_watermark(db, "departments")
+        db.rollback()  # ingest_rows begins its own transaction
+        rows = ({"id": 9721 + i, "name": f"Once {i}"} for i in range(3))
+        assert ingest_rows(db, "departments", rows) == 3
+        versions = db.execute(text("SELECT change_version FROM departments WHERE id BETWEEN 9721 AND 9723")).scalars().all()
+        assert versions == [before + 1] * 3
+        # No second pass over the loaded rows
+        assert not [s for s in statements if s.lstrip().upper().startswith("UPDATE DEPARTMENTS")]
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+        db.close()
+
+def test_empty_load_takes_no_version():
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        before = current_watermark(db, "departments")
+        db.rollback()
+        assert ingest_rows(db, "departments", iter(())) == 0
+        assert ingest_rows(db, "departments", iter(()), mode="upsert") == 0
+        assert ingest_csv(db, "departments", "id,name\n")["inserted"] == 0
+        assert current_watermark(db, "departments") == before
+    finally:
+        db.close()
+
+def test_batch_gives_up_while_a_bulk_load_holds_the_counter(postgres_url):
+    engine_pg = create_engine(postgres_url)
+    with engine_pg.begin() as conn:
+        conn.execute(text('DROP SCHEMA IF EXISTS "changes_test" CASCADE'))
+        conn.execute(text('CREATE SCHEMA "changes_test"'))
+
+    @event.listens_for(engine_pg, "connect")
+    def _search_path(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        cur.execute('SET search_path TO "changes_test"')
+        cur.close()
+        dbapi_conn.commit()
+
+    engine_pg.dispose()
+    Base.metadata.create_all(engine_pg)
+    Session = sessionmaker(bind=engine_pg)
+    try:
+        with Session() as loader, Session() as writer:
+            with loader.begin():
+                next_change_version(loader, "departments")  # what a bulk load does first
+                with pytest.raises(ChangeCounterBusy):
+                    GroupCommitter(max_wait_ms=0, lock_timeout_ms=100).submit(
+                        writer, "departments", Department, [{"id": 1, "name": "Blocked"}])
+            # Once the load has committed the same write goes through
+            assert GroupCommitter(max_wait_ms=0, lock_timeout_ms=100).submit(
+                writer, "departments", Department, [{"id": 1, "name": "Blocked"}]) == 1
+    finally:
+        engine_pg.dispose()
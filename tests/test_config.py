@@ -0,0 +1,28 @@
+import os
+import subprocess
+import sys
+from app import config
+
+def test_snapshot_round_trip_leaves_no_temp_files(tmp_path):
+    path = tmp_path / "cache" / "settings.json"
+    data = config.compile_config(str(path))
+
+    assert config._load_snapshot(str(path)) == data
+    assert os.listdir(path.parent) == ["settings.json"]
+
+def test_unwritable_snapshot_falls_back_to_memory(tmp_path):
+    blocker = tmp_path / "not_a_dir"
+    blocker.write_text("")
+    data = config.compile_config(str(blocker / "settings.json"))
+    assert data["settings"]["ingest"]["batch_size"] == config.SETTINGS["ingest"]["batch_size"]
+
+def test_import_never_writes_into_the_source_tree(tmp_path):
+    before = sorted(os.listdir(config.CONFIG_DIR))
+    env = {k: v for k, v in os.environ.items() if k != "CONFIG_SNAPSHOT"}
+    env["XDG_CACHE_HOME"] = str(tmp_path)
+    subprocess.run([sys.executable, "-c", "import app.config"], check=True, env=env,
+                   cwd=os.path.dirname(config.CONFIG_DIR))
+
+    assert sorted(os.listdir(config.CONFIG_DIR)) == before
+    [snapshot] = os.listdir(tmp_path / "db_migration_api")
+    assert snapshot.startswith("config-") and snapshot.endswith(".json")
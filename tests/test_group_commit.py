@@ -0,0 +1,126 @@
+import threading
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db import Base, get_db
+from app.main import app
+from app.models import Department
+from app.utils.changes import current_watermark
+from app.utils.group_commit import GroupCommitter
+
+client = TestClient(app)
+
+def _test_session(_):
+    return next(app.dependency_overrides[get_db]())
+
+def _submit_concurrently(committer: GroupCommitter, batches, session=_test_session):
+    results = [None] * len(batches)
+    start = threading.Barrier(len(batches))
+
+    def run(i, rows):
+        db = session(i)
+        try:
+            start.wait()
+            results[i] = committer.submit(db, "departments", Department, rows)
+        except Exception as e:
+            results[i] = e
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=run, args=(i, rows), daemon=True) for i, rows in enumerate(batches)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    assert not any(t.is_alive() for t in threads), "a caller is stuck waiting for its batch"
+    return results
+
+def _names(ids):
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        rows = db.query(Department.id, Department.name, Department.change_version).filter(Department.id.in_(ids)).all()
+        return {r.id: (r.name, r.change_version) for r in rows}
+    finally:
+        db.close()
+
+def test_concurrent_batches_share_one_commit():
+    committer = GroupCommitter(max_wait_ms=200, max_rows=1000)
+    batches = [[{"id": 9861 + 2 * i, "name": f"Group {i}a"}, {"id": 9862 + 2 * i, "name": f"Group {i}b"}] for i in range(4)]
+
+    results = _submit_concurrently(committer, batches)
+
+    assert results == [2, 2, 2, 2]
+    assert committer.flushes == 1
+    stored = _names(range(9861, 9869))
+    assert len(stored) == 8
+    assert len({version for _, version in stored.values()}) == 1
+
+def test_failing_batch_fails_alone():
+    assert client.post("/departments/batch", json=[{"id": 9871, "name": "Taken"}]).status_code == 200
+    committer = GroupCommitter(max_wait_ms=200, max_rows=1000)
+    batches = [
+        [{"id": 9872, "name": "Good A"}],
+        [{"id": 9871, "name": "Duplicate"}, {"id": 9873, "name": "Rolled Back"}],
+        [{"id": 9874, "name": "Good B"}],
+    ]
+
+    results = _submit_concurrently(committer, batches)
+
+    assert results[0] == 1 and results[2] == 1
+    assert isinstance(results[1], Exception)
+    stored = _names([9871, 9872, 9873, 9874])
+    assert stored[9871][0] == "Taken"
+    assert 9873 not in stored
+    assert {9872, 9874} <= set(stored)
+
+def test_batch_route_reports_its_own_rows():
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        before = current_watermark(db, "departments")
+    finally:
+        db.close()
+
+    response = client.post("/departments/batch", json=[{"id": 9881, "name": "Route A"}, {"id": 9882, "name": "Route B"}])
+    assert response.status_code == 200, response.text
+    assert response.json() == {"inserted": 2}
+    assert {v for _, v in _names([9881, 9882]).values()} == {before + 1}
+
+    response = client.post("/departments/batch", json=[{"id": 9881, "name": "Route Again"}])
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("Insert failed")
+
+def test_tenants_sharing_a_url_never_share_a_flush():
+    # Two databases behind the same URL, like Postgres tenants that differ only by search_path
+    engines = [create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}) for _ in range(2)]
+    for engine in engines:
+        Base.metadata.create_all(engine)
+    assert str(engines[0].url) == str(engines[1].url)
+    committer = GroupCommitter(max_wait_ms=200, max_rows=1000)
+    batches = [[{"id": 1 + i, "name": f"Tenant {i % 2} #{i}"}] for i in range(4)]
+
+    results = _submit_concurrently(committer, batches, session=lambda i: sessionmaker(bind=engines[i % 2])())
+
+    assert results == [1, 1, 1, 1]
+    assert committer.flushes == 2
+    for n, engine in enumerate(engines):
+        with engine.connect() as conn:
+            names = conn.execute(text("SELECT name FROM departments ORDER BY id")).scalars().all()
+        assert names == [f"Tenant {n} #{i}" for i in range(n, 4, 2)]
+        engine.dispose()
+
+def test_failing_flush_releases_every_caller(monkeypatch):
+    committer = GroupCommitter(max_wait_ms=200, max_rows=1000)
+    flush = committer._flush
+
+    def broken(*args):
+        raise RuntimeError("flush exploded")
+
+    monkeypatch.setattr(committer, "_flush", broken)
+    results = _submit_concurrently(committer, [[{"id": 9891 + i, "name": f"Broken {i}"}] for i in range(4)])
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+    # The group is not left busy: the next caller leads and writes
+    monkeypatch.setattr(committer, "_flush", flush)
+    assert _submit_concurrently(committer, [[{"id": 9895, "name": "After Broken"}]]) == [1]
+    assert _names([9895]) and not _names(range(9891, 9895))
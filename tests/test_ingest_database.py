@@ -0,0 +1,84 @@
+import sqlite3
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.db_ingest import load_order
+
+client = TestClient(app)
+HEADERS = {"X-Admin-Token": "test-admin-token"}
+
+def _make_source(path):
+    # Source schema with aliased column names (see config/header_mappings.yaml)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE departments (dept_id INTEGER PRIMARY KEY, department_name TEXT);
+        CREATE TABLE jobs (job_id INTEGER PRIMARY KEY, job_title TEXT);
+        CREATE TABLE employees (emp_id INTEGER PRIMARY KEY, name TEXT, dept_id INTEGER, job_id INTEGER, start_date TEXT, salary REAL);
+        INSERT INTO departments VALUES (9901, 'Source Dept A'), (9902, 'Source Dept B');
+        INSERT INTO jobs VALUES (9901, 'Source Job A');
+        INSERT INTO employees VALUES
+            (9901, 'Source One', 9901, 9901, '2021-04-01 10:00:00+00:00', 1.0),
+            (9902, 'Source Two', 9902, 9901, '2020-01-15', 2.0),
+            (9903, 'Source Bad', NULL, 9901, '2020-01-15', 3.0);
+    """)
+    conn.commit()
+    conn.close()
+
+def test_load_order_follows_foreign_keys():
+    assert load_order(["employees", "jobs", "departments"]) == ["departments", "jobs", "employees"]
+    assert load_order(["employees"]) == ["employees"]
+
+def test_ingest_database_requires_admin(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    response = client.post("/ingest/database", data={"source": "data/migration.sqlite3"})
+    assert response.status_code == 401
+
+def test_ingest_database_streams_tables_in_fk_order(monkeypatch, tmp_path):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    source = tmp_path / "source.sqlite3"
+    _make_source(source)
+
+    response = client.post("/ingest/database", headers=HEADERS,
+                           data={"source": str(source), "skip_invalid_rows": "true"})
+    assert response.status_code == 200, response.text
+    tables = response.json()["tables"]
+    assert list(tables) == ["departments", "jobs", "employees"]
+    assert tables["departments"] == {"inserted": 2, "skipped": 0, "duplicates": 0}
+    assert tables["employees"] == {"inserted": 2, "skipped": 1, "duplicates": 0}
+
+    conn = sqlite3.connect("test.db")
+    rows = conn.execute("SELECT id, name, department_id, substr(hire_date, 1, 10) FROM employees WHERE id BETWEEN 9901 AND 9903 ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [(9901, "Source One", 9901, "2021-04-01"), (9902, "Source Two", 9902, "2020-01-15")]
+
+def test_ingest_database_reports_invalid_rows(monkeypatch, tmp_path):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    source = tmp_path / "source.sqlite3"
+    _make_source(source)
+    response = client.post("/ingest/database", headers=HEADERS,
+                           data={"source": str(source), "tables": "employees", "mode": "upsert"})
+    assert response.status_code == 400
+    assert "row 3" in response.json()["detail"]
+
+def test_ingest_database_applies_the_duplicates_policy(monkeypatch, tmp_path):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    source = tmp_path / "dups.sqlite3"
+    conn = sqlite3.connect(source)
+    conn.executescript("""
+        CREATE TABLE jobs (job_id INTEGER, job_title TEXT);
+        INSERT INTO jobs VALUES (9921, 'Dup Job First'), (9922, 'Dup Job Other'), (9921, 'Dup Job Last');
+    """)
+    conn.commit()
+    conn.close()
+
+    data = {"source": str(source), "tables": "jobs", "mode": "upsert"}
+    response = client.post("/ingest/database", headers=HEADERS, data={**data, "duplicates": "reject"})
+    assert response.status_code == 400
+    assert "duplicate id 9921" in response.json()["detail"]
+
+    response = client.post("/ingest/database", headers=HEADERS, data={**data, "duplicates": "last_wins"})
+    assert response.status_code == 200, response.text
+    assert response.json()["tables"]["jobs"] == {"inserted": 2, "skipped": 0, "duplicates": 1}
+    conn = sqlite3.connect("test.db")
+    rows = conn.execute("SELECT id, title FROM jobs WHERE id IN (9921, 9922) ORDER BY id").fetchall()
+    conn.close()
+    assert rows == [(9921, "Dup Job Last"), (9922, "Dup Job Other")]
@@ -1,7 +1,10 @@
+import asyncio
+import io
 import os
 import sqlite3
 from fastapi.testclient import TestClient
 from app.main import app
+from app.routers import ingest as ingest_router
 
 client = TestClient(app)
 
@@ -30,3 +33,21 @@ def test_rows_inserted():
     row_count = cursor.fetchone()[0]
     conn.close()
     assert row_count > 0
+
+def test_source_path_is_opened_off_the_event_loop(monkeypatch):
+    # Opening a URL or file blocks: it must happen in the threadpool, not on the event loop
+    opened_on_loop = []
+
+    def _fake_open(source):
+        try:
+            asyncio.get_running_loop()
+            opened_on_loop.append(True)
+        except RuntimeError:
+            opened_on_loop.append(False)
+        return io.StringIO("id,name\n9931,Threadpool\n")
+
+    monkeypatch.setattr(ingest_router, "_open_source", _fake_open)
+    response = client.post("/ingest/csv", data={"table": "departments", "source_path": "https://example.invalid/d.csv",
+                                                "mode": "upsert"})
+    assert response.status_code == 200, response.text
+    assert opened_on_loop == [False]
@@ -0,0 +1,101 @@
+import csv
+import io
+import sqlite3
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app.db import get_db
+from app.main import app
+from app.utils import csv_ingest
+
+client = TestClient(app)
+
+def _dry_run(table: str, content: str):
+    files = {"file": (f"{table}.csv", content.encode("utf-8"), "text/csv")}
+    return client.post("/ingest/csv", data={"table": table, "dry_run": "true"}, files=files)
+
+def test_dry_run_reports_row_errors_without_writing():
+    content = (
+        "id,name\n"
+        "8001,Dry Run Dept A\n"
+        "abc,Dry Run Dept B\n"       # bad id
+        "8001,Dry Run Dept C\n"      # duplicate id in file
+        "8002,Dry Run Dept A\n"      # duplicate name in file
+        "8003,Dry Run Dept D\n"
+    )
+    response = _dry_run("departments", content)
+
+    assert response.status_code == 200
+    assert response.headers["x-rows-checked"] == "5"
+    assert response.headers["x-rows-failed"] == "3"
+    report = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(r["row"], r["column"]) for r in report] == [("3", "id"), ("4", "id"), ("5", "name")]
+
+    # Nothing was written
+    conn = sqlite3.connect("test.db")
+    count = conn.execute("SELECT COUNT(*) FROM departments WHERE id IN (8001, 8003)").fetchone()[0]
+    conn.close()
+    assert count == 0
+
+def test_dry_run_checks_foreign_keys():
+    content = (
+        "id,name,hire_date,department_id,job_id\n"
+        "8101,Ada Dry,2021-03-01T10:00:00Z,999999,999999\n"
+        "8102,Bob Dry,not-a-date,1,1\n"
+    )
+    response = _dry_run("employees", content)
+
+    assert response.status_code == 200
+    report = list(csv.DictReader(io.StringIO(response.text)))
+    assert {(r["row"], r["column"]) for r in report} == {("2", "department_id"), ("2", "job_id"), ("3", "hire_date")}
+
+def test_dry_run_looks_up_foreign_keys_in_bounded_batches(monkeypatch):
+    monkeypatch.setattr(csv_ingest, "MAX_IN_PARAMS", 2)
+    departments = [{"id": 8291 + i, "name": f"Dry Batch Dept {i}"} for i in range(4)]
+    assert client.post("/departments/batch", json=departments).status_code == 200
+    assert client.post("/jobs/batch", json=[{"id": 8291, "title": "Dry Batch Job"}]).status_code == 200
+    content = "id,name,hire_date,department_id,job_id\n" + "".join(
+        f"{8201 + i},Batch {i},2021-03-01T10:00:00Z,{dep},8291\n" for i, dep in enumerate([8291, 8292, 8293, 8294, 999999])
+    )
+    statements = []
+
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        if " IN (" in statement:
+            statements.append((statement.split(" FROM ")[1].split()[0], len(parameters)))
+
+    engine = next(app.dependency_overrides[get_db]()).get_bind()
+    event.listen(engine, "before_cursor_execute", _record)
+    try:
+        response = _dry_run("employees", content)
+    finally:
+        event.remove(engine, "before_cursor_execute", _record)
+
+    assert response.status_code == 200
+    report = list(csv.DictReader(io.StringIO(response.text)))
+    assert [(r["row"], r["column"]) for r in report] == [("6", "department_id")]
+    # Every executed lookup stays within MAX_IN_PARAMS bind parameters
+    assert statements and all(n <= 2 for _, n in statements), statements
+    # Only the ids the file references are fetched, never the whole parent table
+    parents = [(table, n) for table, n in statements if table != "employees"]
+    assert sorted(parents) == [("departments", 1), ("departments", 2), ("departments", 2), ("jobs", 1)]
+
+def test_replace_dry_run_reports_orphaned_children():
+    assert client.post("/departments/batch", json=[{"id": 8301, "name": "Dry Parent A"}, {"id": 8302, "name": "Dry Parent B"}]).status_code == 200
+    assert client.post("/jobs/batch", json=[{"id": 8301, "title": "Dry Parent Job"}]).status_code == 200
+    assert client.post("/employees/batch", json=[
+        {"id": 8301, "name": "Dry Child", "hire_date": "2021-01-01T00:00:00Z", "department_id": 8302, "job_id": 8301},
+    ]).status_code == 200
+
+    # Every current department except 8302, so employee 8301 is the only child left without a parent
+    conn = sqlite3.connect("test.db")
+    kept = conn.execute("SELECT id, name FROM departments WHERE id <> 8302 ORDER BY id").fetchall()
+    conn.close()
+    content = io.StringIO()
+    csv.writer(content).writerows([("id", "name"), *kept])
+    files = {"file": ("departments.csv", content.getvalue().encode("utf-8"), "text/csv")}
+    for _ in range(2):  # the temporary id table does not outlive the dry run
+        response = client.post("/ingest/csv", data={"table": "departments", "dry_run": "true", "mode": "replace"}, files=files)
+        assert response.status_code == 200, response.text
+        assert response.headers["x-file-errors"] == "1"
+        report = list(csv.DictReader(io.StringIO(response.text)))
+        assert [(r["row"], r["column"]) for r in report] == [("", "id")]
+        assert "would orphan employees: department_id [8302]" in report[0]["error"]
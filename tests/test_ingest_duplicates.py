@@ -0,0 +1,85 @@
+import sqlite3
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.keyindex import TextKeySet, IntIdSet
+
+client = TestClient(app)
+
+def _ingest(content: str, duplicates: str, **data):
+    files = {"file": ("departments.csv", content.encode("utf-8"), "text/csv")}
+    return client.post("/ingest/csv", data={"table": "departments", "duplicates": duplicates, **data}, files=files)
+
+def _names(ids):
+    conn = sqlite3.connect("test.db")
+    rows = conn.execute(f"SELECT id, name FROM departments WHERE id IN ({','.join('?' * len(ids))}) ORDER BY id", ids).fetchall()
+    conn.close()
+    return rows
+
+def test_first_wins_keeps_first_occurrence():
+    content = "id,name\n8501,Dup First A\n8501,Dup First B\n8502,Dup First A\n8503,Dup First C\n"
+    response = _ingest(content, "first_wins")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+    assert response.json()["duplicates"] == 2
+    assert _names([8501, 8502, 8503]) == [(8501, "Dup First A"), (8503, "Dup First C")]
+
+def test_last_wins_keeps_last_occurrence():
+    content = "id,name\n8601,Dup Last A\n8601,Dup Last B\n8602,Dup Last C\n"
+    response = _ingest(content, "last_wins")
+
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 2
+    assert response.json()["duplicates"] == 1
+    assert _names([8601, 8602]) == [(8601, "Dup Last B"), (8602, "Dup Last C")]
+
+def test_reject_fails_before_writing():
+    content = "id,name\n8701,Dup Reject A\n8701,Dup Reject B\n"
+    response = _ingest(content, "reject")
+
+    assert response.status_code == 400
+    assert "row 3" in response.json()["detail"]
+    assert _names([8701]) == []
+
+    response = _ingest(content, "reject", skip_invalid_rows="true")
+    assert response.json()["inserted"] == 1
+    assert response.json()["duplicates"] == 1
+    assert response.json()["skipped"] == 0
+
+def test_skipped_duplicates_are_counted_once():
+    content = "id,name\n8711,Dup Once A\n8712,Dup Once B\n8711,Dup Once C\n8713,Dup Once A\nxyz,Dup Once D\n"
+    response = _ingest(content, "reject", skip_invalid_rows="true")
+
+    assert response.status_code == 200, response.text
+    assert (response.json()["inserted"], response.json()["duplicates"], response.json()["skipped"]) == (2, 2, 1)
+    assert _names([8711, 8712, 8713]) == [(8711, "Dup Once A"), (8712, "Dup Once B")]
+
+def test_int_id_set_is_compact():
+    ids = IntIdSet()
+    for i in range(1_000_000):
+        assert ids.add(i)
+    assert not ids.add(123_456)
+    assert 999_999 in ids and 1_000_000 not in ids and -1 not in ids
+    assert len(ids) == 1_000_000
+    assert ids.nbytes < 200_000
+
+def test_int_id_set_falls_back_to_a_set_for_sparse_ids():
+    ids = IntIdSet()
+    sparse = [i * 1_000_003 for i in range(-500, 500)]
+    for i in sparse:
+        assert ids.add(i)
+    assert not ids.add(sparse[10])
+    assert all(i in ids for i in sparse) and 1 not in ids
+    assert len(ids) == 1000
+    assert ids.nbytes < 200_000  # one 8 KiB page per id would be ~8 MiB
+
+class _Colliding(str):
+    def __hash__(self):
+        return 42
+
+def test_text_key_set_confirms_hash_hits():
+    keys = TextKeySet()
+    assert keys.add(_Colliding("Sales"))
+    assert keys.add(_Colliding("Legal"))  # same hash, different key: not a duplicate
+    assert not keys.add(_Colliding("Sales"))
+    assert _Colliding("Legal") in keys and _Colliding("Ops") not in keys
@@ -33,3 +33,16 @@ def test_upload_employees_csv():
 
     print(response.json())
     assert response.status_code == 200, f"Upload failed: {response.json()}"
+
+def test_upload_employees_skips_invalid_rows():
+    # Same pipeline as /ingest/csv: invalid rows are counted, valid ones loaded
+    file_path = os.path.join("data", "employees.csv")
+    with open(file_path, "rb") as f:
+        files = {"file": ("employees.csv", f, "text/csv")}
+        response = client.post("/employees/upload", files=files, data={"skip_invalid_rows": "true"})
+
+    print(response.json())
+    assert response.status_code == 200, f"Upload failed: {response.json()}"
+    body = response.json()
+    assert body["inserted"] > 0
+    assert body["skipped"] > 0
@@ -16,3 +16,12 @@ def test_upload_jobs_csv():
     assert response.status_code == 200
     assert "inserted" in response.json()
     assert response.json()["inserted"] > 0
+
+def test_upload_jobs_csv_with_header_aliases():
+    # Aliases from config/header_mappings.yaml are honored by /jobs/upload
+    content = "job_id,job_title\n9001,Alias Engineer\n9002,Alias Analyst\n"
+    files = {"file": ("jobs_alias.csv", content.encode("utf-8"), "text/csv")}
+    response = client.post("/jobs/upload", files=files)
+
+    assert response.status_code == 200, response.json()
+    assert response.json()["inserted"] == 2
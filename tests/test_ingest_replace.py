@@ -0,0 +1,124 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+from app.db import Base
+from app.utils.csv_ingest import ingest_csv
+from app.utils.table_swap import replace_table
+
+@pytest.fixture()
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'replace.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        ingest_csv(db, "departments", "id,name\n1,Sales\n2,Ops\n3,Legal\n")
+    with Session() as db:
+        ingest_csv(db, "jobs", "id,title\n1,Analyst\n")
+    with Session() as db:
+        ingest_csv(db, "employees", "id,name,department_id,job_id,hire_date\n1,Ana,1,1,2021-01-01\n2,Bo,2,1,2021-01-01\n")
+    yield engine
+    engine.dispose()
+
+def _ingest(engine, table, content, **kwargs):
+    with sessionmaker(bind=engine)() as db:
+        return ingest_csv(db, table, content, mode="replace", **kwargs)
+
+def _rows(engine, sql):
+    with engine.connect() as conn:
+        return conn.execute(text(sql)).all()
+
+def test_replace_swaps_table_content(engine):
+    result = _ingest(engine, "departments", "id,name\n1,Sales EMEA\n2,Ops\n4,Finance\n")
+
+    assert result["inserted"] == 3
+    assert _rows(engine, "SELECT id, name FROM departments ORDER BY id") == [(1, "Sales EMEA"), (2, "Ops"), (4, "Finance")]
+    assert {v for (v,) in _rows(engine, "SELECT change_version FROM departments")} == {2}
+    # Same schema as before: constraints, indexes and no leftover shadow table
+    names = {n for (n,) in _rows(engine, "SELECT name FROM sqlite_master")}
+    assert "ix_departments_change_version" in names and "departments__shadow" not in names
+    assert _rows(engine, "PRAGMA foreign_key_check") == []
+
+def test_replace_rejects_missing_parents_and_orphans(engine):
+    with pytest.raises(ValueError, match=r"department_id \[9\] does not exist in departments"):
+        _ingest(engine, "employees", "id,name,department_id,job_id,hire_date\n5,Cy,9,1,2021-01-01\n")
+    with pytest.raises(ValueError, match=r"would orphan employees: department_id \[2\]"):
+        _ingest(engine, "departments", "id,name\n1,Sales\n")
+
+    # Failed replaces leave the live tables and change versions untouched
+    assert _rows(engine, "SELECT id FROM departments ORDER BY id") == [(1,), (2,), (3,)]
+    assert _rows(engine, "SELECT id FROM employees ORDER BY id") == [(1,), (2,)]
+    assert _rows(engine, "SELECT version FROM change_counter WHERE table_name = 'employees'") == [(1,)]
+
+def test_readers_see_old_table_until_commit(engine):
+    db = sessionmaker(bind=engine)()
+    try:
+        tx = db.begin()
+
+        def load(shadow):
+            db.execute(text(f"INSERT INTO {shadow} (id, title, change_version) VALUES (1, 'Engineer', 2)"))
+            return 1
+
+        assert replace_table(db, "jobs", load) == 1
+        assert db.execute(text("SELECT title FROM jobs")).scalars().all() == ["Engineer"]
+        assert _rows(engine, "SELECT id, title FROM jobs") == [(1, "Analyst")]
+        tx.rollback()
+    finally:
+        db.close()
+    assert _rows(engine, "SELECT id, title FROM jobs") == [(1, "Analyst")]
+
+@pytest.fixture()
+def pg_engine(postgres_url):
+    engine = create_engine(postgres_url)
+    with engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA IF EXISTS "replace_test" CASCADE'))
+        conn.execute(text('CREATE SCHEMA "replace_test"'))
+    engine.dispose()
+
+    engine = create_engine(postgres_url)
+
+    @event.listens_for(engine, "connect")
+    def _search_path(dbapi_conn, _):
+        cur = dbapi_conn.cursor()
+        cur.execute('SET search_path TO "replace_test"')
+        cur.close()
+        dbapi_conn.commit()
+
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        ingest_csv(db, "departments", "id,name\n1,Sales\n2,Ops\n3,Legal\n")
+    with Session() as db:
+        ingest_csv(db, "jobs", "id,title\n1,Analyst\n")
+    with Session() as db:
+        ingest_csv(db, "employees", "id,name,department_id,job_id,hire_date\n1,Ana,1,1,2021-01-01\n2,Bo,2,1,2021-01-01\n")
+    yield engine
+    with engine.begin() as conn:
+        conn.execute(text('DROP SCHEMA "replace_test" CASCADE'))
+    engine.dispose()
+
+_PG_SCHEMA = """
+    SELECT 'constraint', conrelid::regclass::text, conname, pg_get_constraintdef(oid), convalidated::text
+    FROM pg_constraint WHERE connamespace = 'replace_test'::regnamespace
+    UNION ALL
+    SELECT 'index', tablename, indexname, indexdef, '' FROM pg_indexes WHERE schemaname = 'replace_test'
+    ORDER BY 1, 2, 3
+"""
+
+def test_postgres_replace_keeps_constraints_and_indexes(pg_engine):
+    before = _rows(pg_engine, _PG_SCHEMA)
+
+    result = _ingest(pg_engine, "departments", "id,name\n1,Sales EMEA\n2,Ops\n4,Finance\n")
+
+    assert result["inserted"] == 3
+    assert _rows(pg_engine, "SELECT id, name FROM departments ORDER BY id") == [(1, "Sales EMEA"), (2, "Ops"), (4, "Finance")]
+    after = _rows(pg_engine, _PG_SCHEMA)
+    assert after == before  # same names and definitions, FKs validated again
+    assert all(validated == "true" for kind, _, _, _, validated in after if kind == "constraint")
+    assert not [name for _, _, name, _, _ in after if "shadow" in name]
+
+    with pytest.raises(ValueError, match=r"would orphan employees: department_id \[2\]"):
+        _ingest(pg_engine, "departments", "id,name\n1,Sales\n")
+    with pytest.raises(IntegrityError):
+        with pg_engine.begin() as conn:
+            conn.execute(text("INSERT INTO employees (id, name, department_id, change_version) VALUES (3, 'Cy', 9, 0)"))
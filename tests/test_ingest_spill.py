@@ -0,0 +1,41 @@
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from fastapi.testclient import TestClient
+from app.config import SETTINGS
+from app.main import app
+from app.utils.rowbuffer import RowBuffer
+
+client = TestClient(app)
+
+def test_row_buffer_spills_and_round_trips():
+    rows = [
+        (i + 2, {
+            "id": 1000 + i,
+            "name": f"Spill Ñame {i}",
+            "department_id": i % 7,
+            "job_id": i % 11,
+            "hire_date": datetime(2021, 3, 1, 8, 30, 15, 250, tzinfo=timezone(timedelta(hours=-3))) + timedelta(days=i),
+        })
+        for i in range(500)
+    ]
+    with RowBuffer("employees", budget_bytes=4096) as buffer:
+        for idx, row in rows:
+            buffer.append(idx, row)
+        assert buffer.spilled
+        assert len(buffer) == 500
+        assert list(buffer) == rows
+        assert list(buffer) == rows  # replayable
+
+def test_upload_with_tiny_memory_budget(monkeypatch):
+    monkeypatch.setitem(SETTINGS["ingest"], "memory_budget_mb", 0.001)
+    content = "id,name\n" + "".join(f"{i},Spill Dept {i}\n" for i in range(9801, 9851)) + "9801,Spill Dept Last\n"
+    files = {"file": ("departments.csv", content.encode("utf-8"), "text/csv")}
+    response = client.post("/ingest/csv", data={"table": "departments", "duplicates": "last_wins"}, files=files)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["inserted"] == 50
+    assert response.json()["duplicates"] == 1
+    conn = sqlite3.connect("test.db")
+    name = conn.execute("SELECT name FROM departments WHERE id = 9801").fetchone()
+    conn.close()
+    assert name == ("Spill Dept Last",)
@@ -0,0 +1,106 @@
+import shutil
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.db import Base, get_db
+from app.main import app
+from app.utils.csv_ingest import ingest_csv
+from app.utils.hiring_snapshot import get_snapshot
+
+pytest.importorskip("numpy")
+
+client = TestClient(app)
+
+GROUPINGS = ["department,quarter", "year,month", "job", "department,job,quarter"]
+
+def _rows(source: str, group_by: str, **params):
+    response = client.get("/metrics/hiring", params={"group_by": group_by, "source": source, **params})
+    assert response.status_code == 200, response.text
+    assert response.headers["x-metrics-source"] == source
+    return sorted(tuple(sorted(r.items())) for r in response.json())
+
+def _ingest_employees(rows: list[str]):
+    content = "id,name,hire_date,department_id,job_id\n" + "\n".join(rows) + "\n"
+    files = {"file": ("employees.csv", content.encode("utf-8"), "text/csv")}
+    response = client.post("/ingest/csv", data={"table": "employees"}, files=files)
+    assert response.status_code == 200, response.text
+
+def test_snapshot_matches_sql():
+    _ingest_employees([
+        "9501,Snap One,2021-02-10T08:00:00Z,1,1",
+        "9502,Snap Two,2021-05-11T09:30:00Z,2,999999",
+        "9503,Snap Three,2020-12-31T23:59:59Z,1,2",
+    ])
+    for group_by in GROUPINGS:
+        assert _rows("snapshot", group_by) == _rows("sql", group_by)
+        assert _rows("snapshot", group_by, year=2021, include_unknown=False) == _rows("sql", group_by, year=2021, include_unknown=False)
+
+def test_snapshot_refreshes_after_ingest():
+    before = _rows("snapshot", "year,quarter")
+    _ingest_employees(["9601,Snap Later,2019-07-01T12:00:00Z,3,3"])
+    after = _rows("snapshot", "year,quarter")
+
+    assert after != before
+    assert after == _rows("sql", "year,quarter")
+
+def test_hiring_rejects_unknown_group_key():
+    response = client.get("/metrics/hiring", params={"group_by": "department,weekday"})
+    assert response.status_code == 400
+
+def test_snapshot_picks_up_updated_rows():
+    _ingest_employees(["9651,Snap Moved,2018-03-01T12:00:00Z,1,1"])
+    _rows("snapshot", "year")
+
+    db = next(app.dependency_overrides[get_db]())
+    try:
+        content = "id,name,hire_date,department_id,job_id\n9651,Snap Moved,2017-09-01T12:00:00Z,2,2\n"
+        ingest_csv(db, "employees", content, mode="upsert")
+    finally:
+        db.close()
+
+    assert _rows("snapshot", "year") == _rows("sql", "year")
+    assert _rows("snapshot", "department,job") == _rows("sql", "department,job")
+
+def test_snapshot_sees_writes_from_other_processes():
+    _rows("snapshot", "year")
+    # Another worker/process: committed rows and a new watermark, but no notify_write here
+    conn = sqlite3.connect("test.db")
+    with conn:
+        conn.execute("UPDATE change_counter SET version = version + 1 WHERE table_name = 'employees'")
+        version = conn.execute("SELECT version FROM change_counter WHERE table_name = 'employees'").fetchone()[0]
+        conn.execute("INSERT INTO employees (id, name, hire_date, department_id, job_id, change_version) "
+                     "VALUES (9661, 'Snap Elsewhere', '2016-04-01 12:00:00.000000+00:00', 1, 1, ?)", (version,))
+    conn.close()
+
+    assert _rows("snapshot", "year") == _rows("sql", "year")
+
+def test_snapshot_on_lagging_replica_catches_up(tmp_path):
+    primary_path, replica_path = tmp_path / "primary.db", tmp_path / "replica.db"
+    primary = create_engine(f"sqlite:///{primary_path}")
+    replica = create_engine(f"sqlite:///{replica_path}")
+    Base.metadata.create_all(primary)
+
+    def write(rows):
+        with sessionmaker(bind=primary)() as db:
+            ingest_csv(db, "employees", "id,name,department_id,job_id,hire_date\n" + rows)
+
+    def replicate():
+        replica.dispose()
+        shutil.copy(primary_path, replica_path)
+
+    def hired():
+        with sessionmaker(bind=replica)() as db:
+            return get_snapshot(db).aggregate(["year"])
+
+    write("1,Lag One,1,1,2020-01-01\n")
+    replicate()
+    assert hired() == [{"year": 2020, "hired": 1}]
+
+    write("2,Lag Two,1,1,2020-02-01\n")  # committed (and notified) on the primary only
+    assert hired() == [{"year": 2020, "hired": 1}]
+    replicate()
+    assert hired() == [{"year": 2020, "hired": 2}]
+    primary.dispose()
+    replica.dispose()
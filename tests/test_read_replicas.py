@@ -0,0 +1,86 @@
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError, OperationalError
+from fastapi.testclient import TestClient
+from app import db as app_db
+from app.db import ReplicaRouter, SessionLocal, get_read_db
+from app.main import app
+
+# Read-only SQLite connections to the test database stand in for replicas
+REPLICA_A = "sqlite:///file:test.db?mode=ro&uri=true"
+REPLICA_B = "sqlite:///file:./test.db?mode=ro&uri=true"
+DEAD = "sqlite:///file:/nonexistent/replica.db?mode=ro&uri=true"
+
+client = TestClient(app)
+
+def _urls(engines):
+    return [str(e.url) for e in engines]
+
+def test_round_robin_skips_unhealthy_replicas():
+    router = ReplicaRouter([REPLICA_A, DEAD, REPLICA_B], check_interval=60)
+    assert _urls(router.pick() for _ in range(4)) == [REPLICA_A, REPLICA_B, REPLICA_A, REPLICA_B]
+    assert [r.healthy for r in router.replicas] == [True, False, True]
+
+def test_falls_back_to_primary_without_healthy_replica(monkeypatch):
+    router = ReplicaRouter([DEAD], check_interval=60)
+    assert router.pick() is None
+
+    monkeypatch.setattr(app_db, "_router", router)
+    monkeypatch.setattr(app_db, "_engine", "primary-engine")
+    assert app_db.get_read_engine() == "primary-engine"
+
+def test_replica_sessions_refuse_writes():
+    router = ReplicaRouter([REPLICA_A])
+    with router.pick().connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM departments")).scalar() >= 0
+        with pytest.raises(OperationalError):
+            conn.execute(text("INSERT INTO departments (id, name, change_version) VALUES (9991, 'Replica Write', 0)"))
+
+def test_replica_sessions_stay_read_only_after_rollback():
+    router = ReplicaRouter([REPLICA_A])
+    db = SessionLocal(bind=router.pick())
+    try:
+        db.execute(text("SELECT 1"))
+        db.rollback()
+        with pytest.raises(OperationalError):
+            db.execute(text("INSERT INTO departments (id, name, change_version) VALUES (9992, 'Replica Write', 0)"))
+    finally:
+        db.close()
+
+def test_postgres_replica_sessions_stay_read_only_after_rollback(postgres_url):
+    router = ReplicaRouter([postgres_url])
+    engine = router.pick()
+    try:
+        for _ in range(2):  # the second round runs on the connection returned (and reset) by the first
+            db = SessionLocal(bind=engine)
+            try:
+                db.execute(text("SELECT 1"))
+                db.rollback()
+                with pytest.raises(DBAPIError, match="read-only"):
+                    db.execute(text("CREATE TEMP TABLE replica_write (id int)"))
+            finally:
+                db.close()
+    finally:
+        router.dispose()
+
+def test_postgres_replicas_connect_read_only():
+    opts = app_db._replica_opts("postgresql+psycopg://user:pw@replica/hr")
+    assert "default_transaction_read_only=on" in opts["connect_args"]["options"]
+
+def test_metrics_served_from_replica():
+    router = ReplicaRouter([REPLICA_A])
+
+    def _replica_db():
+        db = SessionLocal(bind=router.pick())
+        try:
+            yield db
+        finally:
+            db.close()
+
+    previous = app.dependency_overrides[get_read_db]
+    app.dependency_overrides[get_read_db] = _replica_db
+    try:
+        response = client.get("/metrics/hiring", params={"group_by": "year", "source": "sql"})
+    finally:
+        app.dependency_overrides[get_read_db] = previous
+    assert response.status_code == 200, response.text
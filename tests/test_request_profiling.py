@@ -0,0 +1,76 @@
+import json
+import threading
+import time
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.request_profiler import ProfileStore, ProfilingMiddleware
+
+client = TestClient(app)
+
+ADMIN = {"X-Admin-Token": "test-admin-token"}
+
+def test_profile_flag_returns_retrievable_profile(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+
+    response = client.get("/metrics/hiring", params={"group_by": "year", "source": "sql"}, headers={**ADMIN, "X-Profile": "1"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    profile = client.get(f"/admin/profiles/{profile_id}", headers=ADMIN)
+    assert profile.status_code == 200
+    body = profile.json()
+    assert body["profiles"] and all(p["type"] == "sampled" for p in body["profiles"])
+    assert all(len(p["samples"]) == len(p["weights"]) for p in body["profiles"])
+
+def test_requests_without_flag_or_token_are_not_profiled(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+
+    assert "x-profile-id" not in client.get("/health", headers=ADMIN).headers
+    assert "x-profile-id" not in client.get("/health", params={"profile": "1"}).headers
+
+def test_profile_store_evicts_oldest(tmp_path):
+    store = ProfileStore(str(tmp_path), max_files=2)
+    ids = [f"{i:032x}" for i in range(3)]
+    for profile_id in ids:
+        store.save(profile_id, {"profiles": []})
+
+    assert store.path(ids[0]) is None
+    assert store.path(ids[2]) is not None
+    assert store.path("../etc/passwd") is None
+
+def _busy_request_work(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def _busy_unrelated_work(stop):
+    while not stop.is_set():
+        pass
+
+def test_profile_only_samples_the_request(monkeypatch, tmp_path):
+    monkeypatch.setenv("ADMIN_TOKEN", "test-admin-token")
+    busy = FastAPI()
+
+    @busy.get("/sync")
+    def sync_work():
+        _busy_request_work(0.1)
+        return {}
+
+    store = ProfileStore(str(tmp_path))
+    busy.add_middleware(ProfilingMiddleware, store=store)
+    stop = threading.Event()
+    other = threading.Thread(target=_busy_unrelated_work, args=(stop,))
+    other.start()
+    try:
+        with TestClient(busy) as busy_client:
+            response = busy_client.get("/sync", headers={**ADMIN, "X-Profile": "1"})
+    finally:
+        stop.set()
+        other.join()
+
+    with open(store.path(response.headers["x-profile-id"]), encoding="utf-8") as f:
+        body = json.load(f)
+    names = {body["shared"]["frames"][i]["name"] for p in body["profiles"] for stack in p["samples"] for i in stack}
+    assert "_busy_request_work" in names
+    assert "_busy_unrelated_work" not in names
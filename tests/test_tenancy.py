@@ -0,0 +1,109 @@
+import sqlite3
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app import db as app_db
+from app.config import SETTINGS
+from app.db import Base, get_db, get_read_db
+from app.main import app
+from app.tenancy import TenantEngineCache, tenant_schema
+from app.utils.csv_ingest import ingest_csv
+from app.utils.hiring_snapshot import get_snapshot
+
+client = TestClient(app)
+
+@pytest.fixture()
+def tenants(monkeypatch, tmp_path):
+    template = f"sqlite:///{tmp_path}/{{tenant}}.db"
+    monkeypatch.setitem(SETTINGS, "tenancy", {**SETTINGS["tenancy"], "enabled": True, "url_template": template,
+                                              "tenants": ["acme", "globex"]})
+    monkeypatch.setattr(app_db, "_tenants", None)
+    # Use the real dependencies (tenant routing) instead of the test database overrides
+    monkeypatch.delitem(app.dependency_overrides, get_db)
+    monkeypatch.delitem(app.dependency_overrides, get_read_db)
+    cache = app_db.get_tenant_engines()
+    for name in ("acme", "globex"):
+        Base.metadata.create_all(cache.get(name))
+    yield tmp_path
+    cache.clear()
+
+def _names(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT id, name FROM departments ORDER BY id").fetchall()
+    conn.close()
+    return rows
+
+def test_lru_cache_evicts_least_recently_used_and_idle_engines(tmp_path, monkeypatch):
+    monkeypatch.setitem(SETTINGS, "tenancy", {**SETTINGS["tenancy"], "url_template": f"sqlite:///{tmp_path}/{{tenant}}.db",
+                                              "tenants": ["a", "b", "c", "d"]})
+    evicted = []
+    cache = TenantEngineCache("sqlite://", max_engines=2, idle_timeout=3600, on_evict=evicted.append)
+    a = cache.get("a")
+    cache.get("b")
+    assert cache.get("a") is a
+    cache.get("c")
+    assert cache.tenants() == ["a", "c"]
+    assert [str(e.url) for e in evicted] == [f"sqlite:///{tmp_path}/b.db"]
+
+    cache.idle_timeout = 0
+    cache.get("d")
+    assert cache.tenants() == ["d"]
+    cache.clear()
+
+def test_requests_are_routed_to_tenant_databases(tenants):
+    response = client.post("/departments/batch", json=[{"id": 1, "name": "Acme Sales"}], headers={"X-Tenant-Id": "acme"})
+    assert response.status_code == 200, response.text
+    response = client.post("/t/globex/departments/batch", json=[{"id": 1, "name": "Globex Sales"}])
+    assert response.status_code == 200, response.text
+
+    assert _names(tenants / "acme.db") == [(1, "Acme Sales")]
+    assert _names(tenants / "globex.db") == [(1, "Globex Sales")]
+
+    response = client.get("/t/acme/changes/departments")
+    assert response.status_code == 200
+    assert '"Acme Sales"' in response.text and "Globex" not in response.text
+
+def test_invalid_tenant_is_rejected(tenants):
+    response = client.post("/departments/batch", json=[{"id": 2, "name": "X"}], headers={"X-Tenant-Id": "../etc"})
+    assert response.status_code == 400
+
+def test_unknown_tenant_gets_404_and_no_shard(tenants):
+    response = client.post("/departments/batch", json=[{"id": 3, "name": "X"}], headers={"X-Tenant-Id": "initech"})
+    assert response.status_code == 404
+    assert not (tenants / "initech.db").exists()
+
+    # A shard created since (e.g. by a migration) is discovered
+    Base.metadata.create_all(create_engine(f"sqlite:///{tenants}/initech.db"))
+    app_db.get_tenant_engines().discovery_interval = 0
+    response = client.post("/departments/batch", json=[{"id": 3, "name": "X"}], headers={"X-Tenant-Id": "initech"})
+    assert response.status_code == 200, response.text
+
+def test_tenant_schemas_are_distinct():
+    url = "postgresql+psycopg://localhost/hr"
+    assert tenant_schema("a-b", url) != tenant_schema("a_b", url)
+    with pytest.raises(ValueError):
+        tenant_schema("x" * 60, url)
+
+def test_tenant_routes_disabled_by_default(monkeypatch):
+    monkeypatch.delitem(app.dependency_overrides, get_read_db)
+    response = client.get("/t/acme/metrics/hiring")
+    assert response.status_code == 404
+
+def test_snapshots_are_per_engine_even_with_a_shared_url():
+    pytest.importorskip("numpy")
+    # Same URL, different databases: how Postgres tenants (one URL, one search_path each) look
+    engines = [create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False}) for _ in range(2)]
+    for n, engine in enumerate(engines):
+        Base.metadata.create_all(engine)
+        with sessionmaker(bind=engine)() as db:
+            rows = "".join(f"{i},Hire {i},1,1,2021-0{n + 1}-01\n" for i in range(1, n + 3))
+            ingest_csv(db, "employees", "id,name,department_id,job_id,hire_date\n" + rows)
+
+    counts = []
+    for engine in engines:
+        with sessionmaker(bind=engine)() as db:
+            counts.append(get_snapshot(db).aggregate(["month"]))
+        engine.dispose()
+    assert counts == [[{"month": 1, "hired": 2}], [{"month": 2, "hired": 3}]]
@@ -0,0 +1,52 @@
+import pytest
+from app.utils.timestamps import TimestampParser
+from app.utils.validators import parse_date
+
+VALUES = [
+    "2021-07-27T16:02:08Z",
+    " 2021-07-27T16:02:08Z ",
+    "2021-07-27T16:02:08+00:00",
+    "2021-07-27T16:02:08-03:00",
+    "2021-07-27T16:02:08+05:30",
+    "2021-07-27 16:02:08+02:00",
+    "2021-07-27T16:02:08",
+    "2021-07-27T16:02:08.123456Z",
+    "2021-07-27",
+    "2020-02-29T00:00:00Z",
+    "20210727T160208Z",
+]
+
+INVALID = [
+    "2021-02-30T00:00:00Z",
+    "2021-07-27T24:00:00Z",
+    "2021-13-01",
+    "2021-07-27T16:02:08+24:00",
+    "2021-07-2xT16:02:08Z",
+    "not a date",
+    "2999-01-01T00:00:00Z",
+]
+
+@pytest.mark.parametrize("first", [VALUES[0], VALUES[3], VALUES[8], VALUES[7]])
+def test_matches_parse_date(first):
+    parser = TimestampParser()
+    parser.parse(first)  # layout detected from this value
+    for value in VALUES:
+        assert parser.parse(value) == parse_date(value)
+        assert parser.parse(value).utcoffset() == parse_date(value).utcoffset()
+
+@pytest.mark.parametrize("value", INVALID)
+def test_rejects_what_parse_date_rejects(value):
+    parser = TimestampParser()
+    parser.parse("2021-07-27T16:02:08Z")
+    with pytest.raises(ValueError) as expected:
+        parse_date(value)
+    with pytest.raises(ValueError) as got:
+        parser.parse(value)
+    assert str(got.value) == str(expected.value)
+
+def test_uses_fast_path_for_detected_layout():
+    parser = TimestampParser()
+    for day in range(1, 29):
+        parser.parse(f"2021-02-{day:02d}T10:00:00Z")
+    assert parser.fallbacks == 0
+    assert parser.fast_hits == 28